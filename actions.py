@@ -3,11 +3,14 @@ from __future__ import annotations
 from typing import Optional, Tuple, TYPE_CHECKING
 
 import color
+from entity import Item
 import exceptions
 
+MELEE_NOISE_RADIUS = 10  # Dormant actors this close to a fight are woken by it
+
 if TYPE_CHECKING:
     from engine import Engine
-    from entity import Actor, Entity, Item
+    from entity import Actor, Entity
 
 
 class Action:
@@ -43,12 +46,14 @@ class PickupAction(Action):
         actor_location_y = self.entity.y
         inventory = self.entity.inventory
 
-        for item in self.engine.game_map.items:
-            if actor_location_x == item.x and actor_location_y == item.y:
+        for item in self.engine.game_map.get_entities_at_location(
+            actor_location_x, actor_location_y
+        ):
+            if isinstance(item, Item):
                 if len(inventory.items) >= inventory.capacity:
                     raise exceptions.Impossible("Your inventory is full.")
 
-                self.engine.game_map.entities.remove(item)
+                self.engine.game_map.remove_entity(item)
                 item.parent = self.entity.inventory
                 inventory.items.append(item)
 
@@ -119,7 +124,7 @@ class CheatTakeStairsAction(Action):
         Take the stairs, if any exist at the entity's location.
         """
 
-        self.engine.game_world.generate_floor()
+        self.engine.game_world.descend()
         self.engine.message_log.add_message(
             "You descend the staircase.", color.descend
         )
@@ -128,6 +133,8 @@ class CheatTakeStairsAction(Action):
 class SwitchViewMode(Action):
     def perform(self) -> None:
         "Switch View mode Remove fog of war"
+        if not self.engine.graphics_component:
+            return  # Nothing to switch while headless
 
         self.engine.graphics_component.view_mode = abs(self.engine.graphics_component.view_mode - 1)
 
@@ -138,10 +145,15 @@ class TakeStairsAction(Action):
         Take the stairs, if any exist at the entity's location.
         """
         if (self.entity.x, self.entity.y) == self.engine.game_map.downstairs_location:
-            self.engine.game_world.generate_floor()
+            self.engine.game_world.descend()
             self.engine.message_log.add_message(
                 "You descend the staircase.", color.descend
             )
+        elif (self.entity.x, self.entity.y) == self.engine.game_map.upstairs_location:
+            self.engine.game_world.ascend()
+            self.engine.message_log.add_message(
+                "You ascend the staircase.", color.ascend
+            )
         else:
             raise exceptions.Impossible("There are no stairs here.")
 
@@ -175,12 +187,13 @@ class ActionWithDirection(Action):
 class MeleeAction(ActionWithDirection):
     def perform(self) -> None:
         target = self.target_actor
-        # Update Direction
-        self.entity.update_direction(target.x - self.entity.x)
         if not target:
             raise exceptions.Impossible("Nothing to attack.")
+        # Update Direction
+        self.entity.update_direction(target.x - self.entity.x)
 
         damage = self.entity.fighter.power - target.fighter.defense
+        self.engine.game_map.make_noise(self.entity.x, self.entity.y, MELEE_NOISE_RADIUS)
 
         attack_desc = f"{self.entity.name.capitalize()} attacks {target.name}"
         if self.entity is self.engine.player:
@@ -208,7 +221,7 @@ class MovementAction(ActionWithDirection):
         if not self.engine.game_map.in_bounds(dest_x, dest_y):
             # Destination is out of bounds.
             raise exceptions.Impossible("That way is blocked.")
-        if not self.engine.game_map.tiles["walkable"][dest_x, dest_y]:
+        if not self.engine.game_map.walkable[dest_x, dest_y]:
             # Destination is blocked by a tile.
             raise exceptions.Impossible("That way is blocked.")
         if self.engine.game_map.get_blocking_entity_at_location(dest_x, dest_y):
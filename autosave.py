@@ -0,0 +1,85 @@
+"""
+autosave.py
+Periodic saving of a running game that does not stall it.
+
+Every `interval` turns the game thread takes a snapshot of the Engine: its object graph pickled, with the numpy arrays
+copied out of band, see save_format.snapshot.  Compressing and writing the snapshot to the game's save slot is left to
+a background thread, and the save file is replaced atomically, so a crash loses at most `interval` turns and never
+leaves a broken save.  A write that fails is reported in the message log on the game thread, and the game goes on.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import List, Optional, TYPE_CHECKING
+
+import color
+import save_format
+import save_slots
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from journal import Journal
+
+AUTOSAVE_INTERVAL = 10  # Turns between autosaves, the most a crash can lose
+
+# Compresses and writes the autosaves, one at a time so they land in the order they were taken
+autosave_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autosave_writer")
+
+
+def drop_journal_segments(journal: Journal, turn: int, write: Future) -> None:
+    """Delete the journal segments before `turn` once its snapshot is written."""
+    if not write.cancelled() and write.exception() is None:
+        journal.drop_segments_before(turn)
+
+
+class Autosaver:
+    def __init__(self, slot: int, interval: int = AUTOSAVE_INTERVAL, directory: str = save_slots.SAVE_DIRECTORY):
+        self.slot = slot
+        self.directory = directory
+        self.interval = interval
+        self.saved_turn: Optional[int] = None  # Turn of the last snapshot taken
+        self.pending: Optional[Future] = None  # Write of the last snapshot
+        self.unchecked: List[Future] = []  # Writes not checked for failure yet, oldest first
+
+    def report_failures(self, engine: Engine) -> None:
+        """Add the finished writes that failed to the message log, the writes still running are checked later."""
+        for write in [write for write in self.unchecked if write.done()]:
+            self.unchecked.remove(write)
+            if not write.cancelled() and write.exception() is not None:
+                engine.message_log.add_message(f"Autosave failed: {write.exception()}", color.error)
+
+    def on_turn(self, engine: Engine) -> None:
+        """Called after each turn, autosaves the game once `interval` turns went by since the last autosave.
+
+        A finished game is not saved.
+        """
+        self.report_failures(engine)
+        if not engine.player.is_alive:
+            return
+        if self.saved_turn is None or engine.turn - self.saved_turn >= self.interval:
+            self.save(engine)
+
+    def save(self, engine: Engine) -> None:
+        """Snapshot the game now and write it in the background."""
+        self.report_failures(engine)
+        previous = self.pending
+        snapshot = save_format.snapshot(engine)
+        info = save_slots.slot_info(engine, self.slot)
+        self.saved_turn = engine.turn
+        self.pending = autosave_writer.submit(save_slots.write, snapshot, info, self.directory)
+        self.unchecked.append(self.pending)
+        if engine.journal:
+            # The turns from now on are journaled on top of this snapshot, the older turns once it is written.
+            engine.journal.start_segment(engine)
+            self.pending.add_done_callback(partial(drop_journal_segments, engine.journal, engine.turn))
+        if previous is not None:
+            # A write that has not started yet would only be replaced by this one, so it is dropped.  At most one
+            # snapshot then waits behind the write in progress, however slow the disk.
+            previous.cancel()
+
+    def wait(self, engine: Engine) -> None:
+        """Block until the last autosave is written, then report any write that failed."""
+        if self.pending is not None:
+            self.pending.exception()  # Waits for the write, the writes before it are done by then.
+        self.report_failures(engine)
@@ -0,0 +1,62 @@
+"""
+actor_lod.py
+Time enemy turns on a big open floor full of monsters, with every actor fully simulated and with the scheduler's
+level of detail (dormant and coarse actors).
+
+Run from the repository root:
+    python -m benchmarks.actor_lod
+"""
+import copy
+import random
+import time
+
+from engine import Engine
+import entity_factories
+from game_map import GameMap
+import tile_types
+
+MAP_SIZE = 200
+MONSTER_COUNTS = (100, 1000, 5000)
+TURNS = 50
+
+
+def build_engine(monster_count: int, level_of_detail: bool) -> Engine:
+    random.seed(0)
+    engine = Engine(player=copy.deepcopy(entity_factories.player))
+    engine.player.fighter.base_defense = 1000  # Keep the player alive through every fight
+    game_map = GameMap(engine, MAP_SIZE, MAP_SIZE)
+    game_map.tile_ids[1:-1, 1:-1] = tile_types.FLOOR
+    game_map.refresh_tile_views()
+    engine.game_map = game_map
+    engine.player.place(MAP_SIZE // 2, MAP_SIZE // 2, game_map)
+
+    for _ in range(monster_count):
+        x, y = random.randrange(1, MAP_SIZE - 1), random.randrange(1, MAP_SIZE - 1)
+        if not game_map.get_blocking_entity_at_location(x, y):
+            entity_factories.orc.spawn(game_map, x, y)
+
+    if not level_of_detail:
+        # Nothing is ever far enough or unexplored to be left out.
+        game_map.scheduler.active_radius = game_map.scheduler.sleep_radius = MAP_SIZE
+        game_map.explored[:] = True
+    engine.update_fov()
+    return engine
+
+
+def time_turns(engine: Engine) -> float:
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        engine.handle_enemy_turns()
+    return (time.perf_counter() - start) / TURNS
+
+
+def main() -> None:
+    print(f"{'monsters':>10} {'full (ms/turn)':>16} {'lod (ms/turn)':>15} {'speedup':>10}")
+    for monster_count in MONSTER_COUNTS:
+        full = time_turns(build_engine(monster_count, level_of_detail=False))
+        lod = time_turns(build_engine(monster_count, level_of_detail=True))
+        print(f"{monster_count:>10} {full * 1000:>16.2f} {lod * 1000:>15.2f} {full / lod:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+area_queries.py
+Compare looping over GameMap.actors with the vectorized radius and nearest actor queries used by the area effects.
+
+Run from the repository root:
+    python -m benchmarks.area_queries
+"""
+import copy
+import random
+import timeit
+from typing import List, Optional
+
+from entity import Actor
+import entity_factories
+from game_map import GameMap
+
+ACTOR_COUNTS = (10, 1000, 10000)
+QUERIES = 100
+RADIUS = 5
+
+
+def scan_actors_in_radius(game_map: GameMap, x: int, y: int, radius: float) -> List[Actor]:
+    # How FireballDamageConsumable found its targets before the query API existed.
+    return [actor for actor in game_map.actors if actor.distance(x, y) <= radius]
+
+
+def scan_nearest_actor(game_map: GameMap, x: int, y: int, max_distance: float) -> Optional[Actor]:
+    # How LightningDamageConsumable found its target before the query API existed.
+    target = None
+    closest_distance = max_distance
+    for actor in game_map.actors:
+        if game_map.visible[actor.x, actor.y]:
+            distance = actor.distance(x, y)
+            if distance < closest_distance:
+                target = actor
+                closest_distance = distance
+    return target
+
+
+def build_map(actor_count: int) -> GameMap:
+    size = max(20, int((actor_count * 4) ** 0.5))
+    game_map = GameMap(engine=None, width=size, height=size)
+    game_map.visible[:] = True
+    orc = copy.deepcopy(entity_factories.orc)
+    for _ in range(actor_count):
+        orc.spawn(game_map, random.randrange(size), random.randrange(size))
+    return game_map
+
+
+def main() -> None:
+    random.seed(0)
+    print(f"{'actors':>8} {'query':>8} {'scan (us)':>12} {'numpy (us)':>12} {'speedup':>10}")
+    for actor_count in ACTOR_COUNTS:
+        game_map = build_map(actor_count)
+        points = [
+            (random.randrange(game_map.width), random.randrange(game_map.height))
+            for _ in range(QUERIES)
+        ]
+        cases = (
+            ("radius",
+             lambda: [scan_actors_in_radius(game_map, x, y, RADIUS) for x, y in points],
+             lambda: [game_map.get_actors_in_radius(x, y, RADIUS) for x, y in points]),
+            ("nearest",
+             lambda: [scan_nearest_actor(game_map, x, y, RADIUS) for x, y in points],
+             lambda: [game_map.get_nearest_actor(x, y, RADIUS, mask=game_map.visible) for x, y in points]),
+        )
+        for name, scan_queries, numpy_queries in cases:
+            scan = timeit.timeit(scan_queries, number=1)
+            vectorized = timeit.timeit(numpy_queries, number=1)
+            print(
+                f"{actor_count:>8} {name:>8} {scan / QUERIES * 1e6:>12.1f} {vectorized / QUERIES * 1e6:>12.1f}"
+                f" {scan / vectorized:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
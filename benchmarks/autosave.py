@@ -0,0 +1,63 @@
+"""
+autosave.py
+Compare how long the game thread is stalled by a synchronous save and by an autosave, which only takes a snapshot on
+the game thread and writes it in the background.
+
+Run from the repository root:
+    python -m benchmarks.autosave
+"""
+import os
+import random
+import tempfile
+import timeit
+
+from actions import CheatTakeStairsAction, WaitAction
+from autosave import Autosaver
+from engine import Engine
+import save_format
+import save_slots
+import setup_game
+
+MAP_SIZES = (80, 400)  # Width and height of the floors of each benchmarked game
+FLOORS = 3
+RUNS = 5
+
+
+def build_game(map_size: int) -> Engine:
+    random.seed(0)
+    engine = setup_game.new_game()
+    engine.player.fighter.base_defense = 1000  # Keep the player alive through every fight
+    engine.game_world.map_width = engine.game_world.map_height = map_size
+    for _ in range(FLOORS):
+        engine.handle_action(CheatTakeStairsAction(engine.player))
+        engine.handle_action(WaitAction(engine.player))
+    return engine
+
+
+def main() -> None:
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, "benchmark.sav")
+    autosaver = Autosaver(slot=1, directory=directory)
+
+    print(f"{'map':>5} {'save ms':>8} {'autosave stall ms':>18} {'autosave write ms':>18}")
+    for map_size in MAP_SIZES:
+        engine = build_game(map_size)
+        save_time = timeit.timeit(lambda: save_format.save(engine, filename), number=RUNS) / RUNS
+
+        stall_time = write_time = 0.0
+        for _ in range(RUNS):
+            start = timeit.default_timer()
+            autosaver.save(engine)
+            stall_time += timeit.default_timer() - start
+            autosaver.wait(engine)
+            write_time += timeit.default_timer() - start
+        print(
+            f"{map_size:>5} {save_time * 1000:>8.2f} {stall_time / RUNS * 1000:>18.2f} "
+            f"{write_time / RUNS * 1000:>18.2f}"
+        )
+    os.remove(filename)
+    save_slots.delete(autosaver.slot, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+cellular_automata.py
+Compare the nested list CellularAutomata rules with the numpy backed mode.
+
+Times reset_grid, populate_grid and one pillar and one regular automata_iteration.
+
+Run from the repository root:
+    python -m benchmarks.cellular_automata
+"""
+import random
+import time
+
+from ca import CellularAutomata
+
+GRID_SIZES = (50, 500, 4000)
+LIST_SIZE_LIMIT = 500  # the nested list rules take minutes beyond this
+
+
+def time_rules(size: int, use_numpy: bool) -> float:
+    c = CellularAutomata()
+    c.width = size
+    c.height = size
+    c.use_numpy = use_numpy
+
+    start = time.perf_counter()
+    c.reset_grid()
+    c.populate_grid()
+    c.automata_iteration(make_pillars=1)
+    c.automata_iteration(make_pillars=0)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    random.seed(0)
+    print(f"{'grid':>11} {'lists (s)':>10} {'numpy (s)':>10} {'speedup':>10}")
+    for size in GRID_SIZES:
+        array_time = time_rules(size, use_numpy=True)
+        if size <= LIST_SIZE_LIMIT:
+            list_time = time_rules(size, use_numpy=False)
+            print(f"{size:>5}x{size:<5} {list_time:>10.3f} {array_time:>10.3f} {list_time / array_time:>9.0f}x")
+        else:
+            print(f"{size:>5}x{size:<5} {'skipped':>10} {array_time:>10.3f} {'-':>10}")
+
+
+if __name__ == "__main__":
+    main()
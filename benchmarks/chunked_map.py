@@ -0,0 +1,50 @@
+"""
+chunked_map.py
+Report the memory of maps generated at growing world sizes, dense up to CHUNKED_MAP_AREA tiles and chunked past it.
+
+Run from the repository root:
+    python -m benchmarks.chunked_map
+"""
+import random
+import time
+
+import procgen
+
+WORLD_SIZES = (200, 2000, 20000)
+MAX_ROOMS = 30
+
+
+def main() -> None:
+    print(f"{'size':>6} {'backend':>14} {'generate s':>11} {'dense KiB':>12} {'in memory KiB':>14} {'after unload KiB':>17}")
+    for size in WORLD_SIZES:
+        start = time.perf_counter()
+        dungeon = procgen.generate_dungeon(
+            max_rooms=MAX_ROOMS,
+            room_min_size=6,
+            room_max_size=10,
+            map_width=size,
+            map_height=size,
+            engine=None,
+            floor_number=1,
+            rng=random.Random(0),
+        )
+        generate_time = time.perf_counter() - start
+
+        # What the map's arrays take when every tile is stored
+        dense_bytes = size * size * sum(
+            array.dtype.itemsize for array in (
+                dungeon.tile_ids, dungeon.walkable, dungeon.transparent, dungeon.walkable_bitmasking,
+                dungeon.visible, dungeon.explored, dungeon.walkable_cost,
+            )
+        )
+        loaded_bytes = dungeon.nbytes
+        dungeon.unload_far_chunks(*dungeon.start_location)
+
+        print(
+            f"{size:>6} {type(dungeon).__name__:>14} {generate_time:>11.3f} {dense_bytes / 1024:>12.0f}"
+            f" {loaded_bytes / 1024:>14.0f} {dungeon.nbytes / 1024:>17.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
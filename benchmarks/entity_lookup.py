@@ -0,0 +1,63 @@
+"""
+entity_lookup.py
+Compare the old linear scan over GameMap.entities with the tile keyed entity index.
+
+Run from the repository root:
+    python -m benchmarks.entity_lookup
+"""
+import random
+import timeit
+from typing import Optional
+
+from entity import Entity
+from game_map import GameMap
+
+ENTITY_COUNTS = (10, 1000, 10000)
+QUERIES = 1000
+
+
+def scan_blocking_entity_at_location(game_map: GameMap, x: int, y: int) -> Optional[Entity]:
+    # The lookup GameMap used before the entity index existed.
+    for entity in game_map.entities:
+        if entity.blocks_movement and entity.x == x and entity.y == y:
+            return entity
+
+    return None
+
+
+def build_map(entity_count: int) -> GameMap:
+    size = max(20, int((entity_count * 4) ** 0.5))
+    game_map = GameMap(engine=None, width=size, height=size)
+    for _ in range(entity_count):
+        Entity(
+            parent=game_map,
+            x=random.randrange(size),
+            y=random.randrange(size),
+            blocks_movement=random.random() < 0.5,
+        )
+    return game_map
+
+
+def main() -> None:
+    random.seed(0)
+    print(f"{'entities':>10} {'scan (us)':>12} {'index (us)':>12} {'speedup':>10}")
+    for entity_count in ENTITY_COUNTS:
+        game_map = build_map(entity_count)
+        points = [
+            (random.randrange(game_map.width), random.randrange(game_map.height))
+            for _ in range(QUERIES)
+        ]
+
+        scan = timeit.timeit(
+            lambda: [scan_blocking_entity_at_location(game_map, x, y) for x, y in points], number=1
+        )
+        index = timeit.timeit(
+            lambda: [game_map.get_blocking_entity_at_location(x, y) for x, y in points], number=1
+        )
+        print(
+            f"{entity_count:>10} {scan / QUERIES * 1e6:>12.2f} {index / QUERIES * 1e6:>12.2f} {scan / index:>9.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
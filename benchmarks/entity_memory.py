@@ -0,0 +1,57 @@
+"""
+entity_memory.py
+Report the memory taken by a floor holding 10k entities: living monsters, corpses and items.
+
+Run from the repository root:
+    python -m benchmarks.entity_memory
+"""
+import random
+import timeit
+import tracemalloc
+
+import entity_factories
+from game_map import GameMap
+
+ENTITY_COUNT = 10000
+MAP_SIZE = 200
+
+
+def build_floor() -> GameMap:
+    game_map = GameMap(engine=None, width=MAP_SIZE, height=MAP_SIZE)
+    prototypes = [entity_factories.orc, entity_factories.troll, entity_factories.health_potion,
+                  entity_factories.dagger, entity_factories.fireball_scroll]
+    for i in range(ENTITY_COUNT):
+        entity = random.choice(prototypes).spawn(game_map, random.randrange(MAP_SIZE), random.randrange(MAP_SIZE))
+        if i % 3 == 0 and entity.ai:
+            # A corpse, as Fighter.die leaves it
+            entity.ai = None
+            entity.blocks_movement = False
+            entity.name = f"remains of {entity.name}"
+            game_map.update_entity(entity)
+    return game_map
+
+
+def main() -> None:
+    random.seed(0)
+    build_floor()  # Warm up caches and imports outside the measurement
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    game_map = build_floor()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    arrays = game_map.nbytes
+    print(f"{ENTITY_COUNT} entities on a {MAP_SIZE}x{MAP_SIZE} floor")
+    print(f"  total allocated:    {total / 1024:>10.1f} KiB")
+    print(f"  map arrays:         {arrays / 1024:>10.1f} KiB")
+    print(f"  per entity:         {(total - arrays) / ENTITY_COUNT:>10.1f} bytes")
+
+    entities = list(game_map.entities)
+    reads = timeit.timeit(lambda: [(entity.x, entity.y, entity.blocks_movement) for entity in entities], number=10)
+    print(f"  attribute reads:    {reads / (10 * len(entities) * 3) * 1e9:>10.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
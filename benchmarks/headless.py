@@ -0,0 +1,41 @@
+"""
+headless.py
+Time a game session with no graphics frontend: start up (imports and new_game) and turns per second.
+
+Run from the repository root:
+    python -m benchmarks.headless
+"""
+import random
+import sys
+import time
+
+TURNS = 2000
+
+
+def main() -> None:
+    start = time.perf_counter()
+    import setup_game
+    from actions import BumpAction, WaitAction
+
+    random.seed(0)
+    engine = setup_game.new_game()
+    startup = time.perf_counter() - start
+    assert not any(module == "kivy" or module.startswith("kivy.") for module in sys.modules), "Kivy was imported"
+
+    turns = 0
+    start = time.perf_counter()
+    while turns < TURNS:
+        if not engine.player.is_alive:
+            engine = setup_game.new_game()
+        dx, dy = random.choice([-1, 0, 1]), random.choice([-1, 0, 1])
+        action = BumpAction(engine.player, dx, dy) if dx or dy else WaitAction(engine.player)
+        if engine.handle_action(action):
+            turns += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"start up: {startup * 1000:.1f} ms")
+    print(f"{turns} turns in {elapsed:.3f} s ({turns / elapsed:.0f} turns/s)")
+
+
+if __name__ == "__main__":
+    main()
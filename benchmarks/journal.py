@@ -0,0 +1,63 @@
+"""
+journal.py
+Compare the cost of journaling a turn to the cost of saving the whole game every turn.
+
+Run from the repository root:
+    python -m benchmarks.journal
+"""
+import os
+import random
+import shutil
+import tempfile
+import timeit
+
+from actions import CheatTakeStairsAction, WaitAction
+from engine import Engine
+from journal import Journal
+import save_format
+import setup_game
+
+MAP_SIZES = (80, 400)  # Width and height of the floors of each benchmarked game
+FLOORS = 3
+TURNS = 200
+
+
+def build_game(map_size: int) -> Engine:
+    random.seed(0)
+    engine = setup_game.new_game()
+    engine.player.fighter.base_defense = 1000  # Keep the player alive through every fight
+    engine.game_world.map_width = engine.game_world.map_height = map_size
+    for _ in range(FLOORS):
+        engine.handle_action(CheatTakeStairsAction(engine.player))
+        engine.handle_action(WaitAction(engine.player))
+    return engine
+
+
+def main() -> None:
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, "benchmark.sav")
+
+    print(f"{'map':>5} {'save ms':>8} {'journal us':>11} {'journal bytes':>14}")
+    for map_size in MAP_SIZES:
+        engine = build_game(map_size)
+        save_time = timeit.timeit(lambda: save_format.save(engine, filename), number=5) / 5
+
+        journal = Journal(os.path.join(directory, f"map{map_size}"))
+        journal.start_segment(engine)
+        start_size = journal.file.tell()
+        action = WaitAction(engine.player)
+
+        def journal_turn() -> None:
+            journal.begin_turn(engine, action)
+            engine.turn += 1
+            journal.end_turn(engine)
+
+        journal_time = timeit.timeit(journal_turn, number=TURNS) / TURNS
+        journal_size = (journal.file.tell() - start_size) / TURNS
+        journal.close()
+        print(f"{map_size:>5} {save_time * 1000:>8.2f} {journal_time * 1e6:>11.1f} {journal_size:>14.1f}")
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
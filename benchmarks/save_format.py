@@ -0,0 +1,66 @@
+"""
+save_format.py
+Compare the save container of save_format.py, with each codec, to the legacy lzma compressed pickle.
+
+Run from the repository root:
+    python -m benchmarks.save_format
+"""
+import lzma
+import os
+import pickle
+import random
+import tempfile
+import timeit
+
+from actions import CheatTakeStairsAction, WaitAction
+from engine import Engine
+import save_format
+import setup_game
+
+MAP_SIZES = (80, 400)  # Width and height of the floors of each benchmarked game
+FLOORS = 3
+RUNS = 5
+
+
+def build_game(map_size: int) -> Engine:
+    random.seed(0)
+    engine = setup_game.new_game()
+    engine.player.fighter.base_defense = 1000  # Keep the player alive through every fight
+    engine.game_world.map_width = engine.game_world.map_height = map_size
+    for _ in range(FLOORS):
+        engine.handle_action(CheatTakeStairsAction(engine.player))
+        engine.handle_action(WaitAction(engine.player))
+    return engine
+
+
+def legacy_save(engine: Engine, filename: str) -> None:
+    # How Engine.save_as wrote saves before the container
+    with open(filename, "wb") as f:
+        f.write(lzma.compress(pickle.dumps(engine)))
+
+
+def legacy_load(filename: str) -> Engine:
+    with open(filename, "rb") as f:
+        return pickle.loads(lzma.decompress(f.read()))
+
+
+def main() -> None:
+    filename = os.path.join(tempfile.mkdtemp(), "benchmark.sav")
+    formats = [("legacy lzma", legacy_save, legacy_load)] + [
+        (f"container {codec}", lambda engine, name, codec=codec: save_format.save(engine, name, codec), save_format.load)
+        for codec in save_format.CODECS
+    ]
+
+    print(f"{'map':>5} {'format':>16} {'size KiB':>9} {'save ms':>8} {'load ms':>8}")
+    for map_size in MAP_SIZES:
+        engine = build_game(map_size)
+        for name, save, load in formats:
+            save_time = timeit.timeit(lambda: save(engine, filename), number=RUNS) / RUNS
+            size = os.path.getsize(filename)
+            load_time = timeit.timeit(lambda: load(filename), number=RUNS) / RUNS
+            print(f"{map_size:>5} {name:>16} {size / 1024:>9.1f} {save_time * 1000:>8.2f} {load_time * 1000:>8.2f}")
+    os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+spawning.py
+Compare copy.deepcopy of the entity_factories templates with their clone path.
+
+Run from the repository root:
+    python -m benchmarks.spawning
+"""
+import copy
+import timeit
+
+import entity_factories
+
+SPAWNS = 10000
+
+
+def main() -> None:
+    print(f"{'prototype':>18} {'deepcopy (us)':>14} {'clone (us)':>12} {'speedup':>10}")
+    for name, prototype in entity_factories.PROTOTYPES.items():
+        deepcopy = timeit.timeit(lambda: copy.deepcopy(prototype), number=SPAWNS)
+        clone = timeit.timeit(prototype.clone, number=SPAWNS)
+        print(
+            f"{name:>18} {deepcopy / SPAWNS * 1e6:>14.2f} {clone / SPAWNS * 1e6:>12.2f} {deepcopy / clone:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+tile_map.py
+Compare a map holding a tile_dt record in every cell with the tile ID array and its walkable and transparent views.
+
+Run from the repository root:
+    python -m benchmarks.tile_map
+"""
+import timeit
+
+import numpy as np  # type: ignore
+from tcod.map import compute_fov
+
+import tile_types
+
+MAP_SIZES = (80, 200, 1000)
+FOV_RUNS = 50
+
+
+def build_tile_ids(size: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    return rng.choice([tile_types.FLOOR, tile_types.WALL], size=(size, size), p=[0.7, 0.3]).astype(np.uint8)
+
+
+def main() -> None:
+    print(f"{'size':>6} {'records KiB':>12} {'IDs KiB':>10} {'ratio':>6} {'FOV records ms':>15} {'FOV IDs ms':>11}")
+    for size in MAP_SIZES:
+        tile_ids = np.asfortranarray(build_tile_ids(size))
+        tiles = tile_types.TILES[tile_ids]  # The per cell records maps used to hold
+        walkable = tile_types.TILE_WALKABLE[tile_ids]
+        transparent = np.asfortranarray(tile_types.TILE_TRANSPARENT[tile_ids])
+
+        record_bytes = tiles.nbytes
+        id_bytes = tile_ids.nbytes + walkable.nbytes + transparent.nbytes
+
+        origin = size // 2, size // 2
+        records_time = timeit.timeit(lambda: compute_fov(tiles["transparent"], origin, radius=8), number=FOV_RUNS)
+        ids_time = timeit.timeit(lambda: compute_fov(transparent, origin, radius=8), number=FOV_RUNS)
+
+        print(
+            f"{size:>6} {record_bytes / 1024:>12.1f} {id_bytes / 1024:>10.1f} {record_bytes / id_bytes:>5.1f}x"
+            f" {records_time / FOV_RUNS * 1000:>15.3f} {ids_time / FOV_RUNS * 1000:>11.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
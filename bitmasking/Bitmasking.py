@@ -20,6 +20,15 @@ class Wall(IntFlag):
     NORTHEAST = 2**7
 
 
+# Neighbour offsets (dx, dy) in Wall bit order
+ORDER = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+
+# Sentinels
+ISOLATED_TILE = 256  # obstacle with no other obstacles around it
+BLANK_TILE = 255  # map perimeter
+BOTTOM_LEFT_CORNER = 5
+
+
 def fetch_wall(pos: Tuple[int, int], walkable_space: np.mat) -> int:
     x, y = pos
     _height, _width = walkable_space.shape
@@ -28,7 +37,7 @@ def fetch_wall(pos: Tuple[int, int], walkable_space: np.mat) -> int:
 
     wall = 0
     # ORDER
-    d = [(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)]
+    d = ORDER
     for i in range(len(d)):
         dx, dy = d[i]
 
@@ -38,24 +47,48 @@ def fetch_wall(pos: Tuple[int, int], walkable_space: np.mat) -> int:
 
     # No other obstacles around, but coordinate itself, is an obstacle
     if wall == 0:
-        wall = 256
+        wall = ISOLATED_TILE
 
     return wall
 
 
 def generate(arr: np.array) -> np.array:
+    """
+    Same result as calling fetch_wall for every coordinate, built for the whole matrix at once from shifted views
+    """
     # False = Not Walkable, True = Walkable
-    width, height = arr.shape
-    wall_space = np.zeros_like(arr, dtype=np.int16)
+    walkable = np.asarray(arr, dtype=bool)
+    width, height = walkable.shape
+
+    # Pad with walkable space so out-of-grid-coordinates are not counted as obstacles
+    obstacles = np.zeros((width + 2, height + 2), dtype=bool)
+    obstacles[1:-1, 1:-1] = ~walkable
 
-    for j in range(width):
-        for i in range(height):
-            num = fetch_wall((i, j), arr)
-            wall_space[j, i] = num
+    wall_space = np.zeros((width, height), dtype=np.int16)
+    for i, (dx, dy) in enumerate(ORDER):
+        wall_space |= obstacles[1 + dy:1 + dy + width, 1 + dx:1 + dx + height].astype(np.int16) << i
+
+    wall_space[(wall_space == 0) & ~walkable] = ISOLATED_TILE
+    wall_space[walkable] = 0
 
     return wall_space
 
 
+def blank_perimeter(wall_space: np.array) -> None:
+    """
+    Reset all values in a perimeter around the map (weird bit masking issues)
+    """
+    wall_space[:, -1] = BLANK_TILE
+    wall_space[:, 0] = BLANK_TILE
+    wall_space[-1, :] = BLANK_TILE
+    wall_space[0, :] = BLANK_TILE
+
+    # Weird Bottom Left Corner Bug?
+    wall_space[1, 1] = BLANK_TILE
+    if wall_space[1, 2] != BLANK_TILE and wall_space[2, 1] != BLANK_TILE:
+        wall_space[1, 1] = BOTTOM_LEFT_CORNER
+
+
 if __name__ == "__main__":
     arr = np.array([[False, False, False, False, False],
                     [False, True, True, True, False],
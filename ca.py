@@ -1,5 +1,6 @@
 from random import randint
-from collections import deque
+
+import numpy as np
 
 
 class CellularAutomata:
@@ -10,10 +11,12 @@ class CellularAutomata:
     min_count = 5  # min count of surrounding walls for the automata rules
     iterations = 0
     pillar_iterations = 1
-    flood_tries = 5
+    flood_tries = 5  # no longer used, flood_find_empty always keeps the biggest cave
     goal_percentage = 30
     open_percentage = 0
+    cave_sizes = []  # number of open cells in every cave found by flood_find_empty, biggest first
     areas_of_interest = []  # areas of open space
+    use_numpy = False  # store the grid as a numpy array and run the automata rules on whole arrays
 
     def generate(self):
         self.reset_grid()
@@ -43,7 +46,7 @@ class CellularAutomata:
         final_str = ""
         final_str += "\n"
 
-        if grid:
+        if grid is not None:
             _grid = grid
         else:
             _grid = self.grid
@@ -61,6 +64,12 @@ class CellularAutomata:
         print(final_str)
 
     def reset_grid(self):
+        if self.use_numpy:
+            new_grid = np.zeros((self.width, self.height), dtype=np.int8)
+            new_grid[0, :] = new_grid[-1, :] = new_grid[:, 0] = new_grid[:, -1] = 1
+            self.grid = new_grid
+            return
+
         new_grid = [[0 for x in range(self.height)] for y in range(self.width)]
         for i in range(len(new_grid)):
             for j in range(len(new_grid[i])):
@@ -69,12 +78,22 @@ class CellularAutomata:
         self.grid = new_grid
 
     def populate_grid(self):
+        if self.use_numpy:
+            # One draw for the whole grid, seeded from the random module so seeded runs stay reproducible
+            rng = np.random.default_rng(randint(0, 2 ** 32 - 1))
+            self.grid[rng.integers(0, 101, size=self.grid.shape) <= self.chance] = 1
+            return
+
         for i in range(len(self.grid)):  # reminder to test with: for index, value in enumerate(grid)
             for j in range(len(self.grid[0])):
                 if randint(0, 100) <= self.chance:  # test with list comprehension instead??
                     self.grid[i][j] = 1
 
     def automata_iteration(self, make_pillars):
+        if self.use_numpy:
+            self.automata_iteration_array(make_pillars)
+            return
+
         make_grid = [row[:] for row in self.grid]
         for i in range(1, len(self.grid) - 1):
             for j in range(1, len(self.grid[0]) - 1):
@@ -93,6 +112,18 @@ class CellularAutomata:
                     make_grid[i][j] = 0
         self.grid = make_grid
 
+    def automata_iteration_array(self, make_pillars):
+        # Same rules as automata_iteration, with the 3x3 obstacle count done as a sum of 9 shifted views
+        width, height = self.grid.shape
+        count = np.zeros((max(width - 2, 0), max(height - 2, 0)), dtype=np.uint8)
+        for k in range(-1, 2):
+            for l in range(-1, 2):
+                count += self.grid[1 + k:width - 1 + k, 1 + l:height - 1 + l] == 1
+
+        make_grid = self.grid.copy()
+        make_grid[1:-1, 1:-1] = (count >= self.min_count) | ((count == 0) & (make_pillars == 1))
+        self.grid = make_grid
+
     @staticmethod
     def inside_circle(center_x, center_y, point_x, point_y, radius):
         dx = center_x - point_x
@@ -146,42 +177,81 @@ class CellularAutomata:
         self.areas_of_interest = areas
 
     def flood_find_empty(self):
-        times_remade = 0
-        percentage = 0
-        make_grid = [[1 for x in range(len(self.grid[0]))] for y in range(len(self.grid))]
-        while times_remade < self.flood_tries and percentage < self.goal_percentage:
-            copy_grid = [row[:] for row in self.grid]
-            open_count = 0
-            times_remade += 1
-            unvisited = deque([])
-            make_grid = [[1 for x in range(len(self.grid[0]))] for y in range(len(self.grid))]
-            # find a random empty space, hope it's the biggest cave
-            randx = randint(0, len(self.grid) - 1)
-            randy = randint(0, len(self.grid[0]) - 1)
-            while self.grid[randx][randy] == 1:
-                randx = randint(0, len(self.grid) - 1)
-                randy = randint(0, len(self.grid[0]) - 1)
-            unvisited.append([randx, randy])
-            while len(unvisited) > 0:
-                current = unvisited.popleft()
-                make_grid[current[0]][current[1]] = 0
-                for k in range(-1, 2):
-                    for l in range(-1, 2):
-                        if current[0] + k >= 0 and current[0] + k < len(self.grid) and current[1] + l >= 0 and current[
-                            1] + l < len(self.grid[0]):  # if we're not out of bounds
-                            if copy_grid[current[0] + k][current[1] + l] == 0:  # if it's an empty space
-                                copy_grid[current[0] + k][current[1] + l] = 2  # mark visited
-                                open_count += 1
-                                unvisited.append([current[0] + k, current[1] + l])
-            percentage = open_count * 100 / (len(self.grid) * len(self.grid[0]))
-            # print("counted {0}, {1}%...".format(open_count, percentage))
-        self.grid = make_grid
+        # Keep only the biggest cave, everything else is filled in with walls
+        labels, sizes = self.label_caves()
+        self.cave_sizes = sorted(sizes.tolist(), reverse=True)
+
+        make_grid = np.ones(labels.shape, dtype=np.int8)
+        if len(sizes):
+            make_grid[labels == np.argmax(sizes)] = 0
+            percentage = sizes.max() * 100 / labels.size
+        else:
+            percentage = 0
+
+        self.grid = make_grid if self.use_numpy else make_grid.tolist()
         self.open_percentage = percentage
 
-        # if percentage < self.goal_percentage:
-        #     print("Failed to produce a big enough cave after {0} tries...".format(self.flood_tries))
-        # else:
-        #     print("Percentage of open space: {0}%".format(percentage))
+    def label_caves(self):
+        """
+        Label every cave (8-connected open cells) of the grid in a single pass.
+
+        Open cells are first grouped into vertical runs, runs touching in neighbouring columns are joined with a
+        union-find over the whole array and the roots are numbered from 0.
+
+        :return: labels, sizes - an int32 array the shape of the grid with the cave number of every open cell (-1 for
+        walls) and the number of cells in each cave
+        """
+        open_space = np.asarray(self.grid) == 0
+        width, height = open_space.shape
+
+        # Number every run of open cells along a column
+        run_start = open_space.copy()
+        run_start[:, 1:] &= ~open_space[:, :-1]
+        run_ids = np.cumsum(run_start, axis=None, dtype=np.int32).reshape(open_space.shape) - 1
+        run_ids[~open_space] = -1
+        run_count = int(run_start.sum())
+
+        # Pairs of runs that touch between neighbouring columns, including diagonally
+        left_runs = []
+        right_runs = []
+        for l in range(-1, 2):
+            left = run_ids[:-1, max(0, -l):height - max(0, l)]
+            right = run_ids[1:, max(0, l):height - max(0, -l)]
+            touching = (left >= 0) & (right >= 0)
+            # Consecutive cells of the same two runs give the same pair, keep the first one only
+            repeated = np.zeros_like(touching)
+            repeated[:, 1:] = (left[:, 1:] == left[:, :-1]) & (right[:, 1:] == right[:, :-1])
+            touching &= ~repeated
+            left_runs.append(left[touching])
+            right_runs.append(right[touching])
+        left_runs = np.concatenate(left_runs)
+        right_runs = np.concatenate(right_runs)
+
+        # Union-find where every root is the lowest run number of its cave
+        parent = np.arange(run_count)
+        while True:
+            left_roots = parent[left_runs]
+            right_roots = parent[right_runs]
+            joining = left_roots != right_roots
+            if not joining.any():
+                break
+            np.minimum.at(
+                parent,
+                np.maximum(left_roots[joining], right_roots[joining]),
+                np.minimum(left_roots[joining], right_roots[joining]),
+            )
+            # Point every run straight at its root
+            while True:
+                grandparent = parent[parent]
+                if np.array_equal(grandparent, parent):
+                    break
+                parent = grandparent
+
+        roots, run_labels = np.unique(parent, return_inverse=True)
+        labels = np.full(open_space.shape, -1, dtype=np.int32)
+        labels[open_space] = run_labels.reshape(-1)[run_ids[open_space]]
+        sizes = np.bincount(labels[open_space], minlength=len(roots))
+        return labels, sizes
 
 
 if __name__ == "__main__":
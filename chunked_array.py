@@ -0,0 +1,225 @@
+"""
+chunked_array.py
+A 2D array stored as fixed size square chunks that are allocated on first write, for maps too large to hold densely.
+
+Reading a chunk that was never written returns fill_value, so memory scales with the area that was actually written
+rather than with the array's shape.  Chunks can also be spilled to disk.  A spilled chunk is read from its file in
+place and only loaded back into memory when it is written.
+
+Indexing supports what the map code uses: integer and slice keys with a step of 1, including negative indices, and
+pairs of integer arrays for gathering scattered cells.  Slicing returns a dense copy, not a view.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, Optional, Set, Tuple, Union
+import weakref
+
+import numpy as np  # type: ignore
+
+CHUNK_SIZE = 64  # Width and height of a chunk, in cells
+
+ChunkKey = Tuple[int, int]
+
+
+class ChunkedArray:
+    ndim = 2
+
+    def __init__(self, shape: Tuple[int, int], dtype: Any, fill_value: Any = 0, chunk_size: int = CHUNK_SIZE):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.fill_value = fill_value
+        self.chunk_size = chunk_size
+        self.chunks: Dict[ChunkKey, np.ndarray] = {}  # Chunks in memory
+        self.spilled: Set[ChunkKey] = set()  # Chunks written to spill_directory
+        self.spill_directory: Optional[str] = None  # Created on the first spill
+
+    def __getstate__(self) -> dict:
+        # Spill files are temporary, so the spilled chunks are pickled along with the loaded ones.
+        state = self.__dict__.copy()
+        state["chunks"] = {**{key: self._read_spilled(key) for key in self.spilled}, **self.chunks}
+        state["spilled"] = set()
+        state["spill_directory"] = None
+        return state
+
+    def __array__(self, dtype: Any = None) -> np.ndarray:
+        return np.asarray(self[:, :], dtype=dtype)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes taken by the chunks in memory."""
+        return sum(chunk.nbytes for chunk in self.chunks.values())
+
+    def chunk_keys(self) -> Set[ChunkKey]:
+        """Return the keys of every allocated chunk, in memory or spilled."""
+        return set(self.chunks) | self.spilled
+
+    def chunk_bounds(self, key: ChunkKey) -> Tuple[slice, slice]:
+        """Return the region of the array a chunk covers, clipped to the array's shape."""
+        chunk_x, chunk_y = key
+        return (
+            slice(chunk_x * self.chunk_size, min((chunk_x + 1) * self.chunk_size, self.shape[0])),
+            slice(chunk_y * self.chunk_size, min((chunk_y + 1) * self.chunk_size, self.shape[1])),
+        )
+
+    def _chunk_path(self, key: ChunkKey) -> str:
+        return os.path.join(self.spill_directory, f"{key[0]}_{key[1]}.npy")
+
+    def _read_spilled(self, key: ChunkKey) -> np.ndarray:
+        return np.load(self._chunk_path(key))
+
+    def _read_chunk(self, key: ChunkKey) -> Optional[np.ndarray]:
+        """Return a chunk for reading, or None if it was never allocated.
+
+        A spilled chunk is memory mapped read-only from its file, it stays spilled.
+        """
+        chunk = self.chunks.get(key)
+        if chunk is None and key in self.spilled:
+            chunk = np.load(self._chunk_path(key), mmap_mode="r")
+        return chunk
+
+    def _get_chunk(self, key: ChunkKey, create: bool) -> Optional[np.ndarray]:
+        """Return a chunk for writing, loading it back if it was spilled, or allocating it if `create` is set."""
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            if key in self.spilled:
+                chunk = self.chunks[key] = self._read_spilled(key)
+                self.spilled.discard(key)
+                os.remove(self._chunk_path(key))
+            elif create:
+                chunk = self.chunks[key] = np.full(
+                    (self.chunk_size, self.chunk_size), fill_value=self.fill_value, dtype=self.dtype, order="F"
+                )
+        return chunk
+
+    def spill(self, key: ChunkKey) -> None:
+        """Write a chunk to disk and free its memory."""
+        chunk = self.chunks.pop(key, None)
+        if chunk is None:
+            return
+        if self.spill_directory is None:
+            self.spill_directory = tempfile.mkdtemp(prefix="chunks_")
+            weakref.finalize(self, shutil.rmtree, self.spill_directory, ignore_errors=True)
+        np.save(self._chunk_path(key), chunk)
+        self.spilled.add(key)
+
+    def _normalize(self, key: Any) -> Tuple[Union[int, slice], Union[int, slice]]:
+        """Return a key as a pair of non-negative ints or of slices with a step of 1, clipped to the shape."""
+        if key is Ellipsis:
+            key = slice(None), slice(None)
+        elif not isinstance(key, tuple):
+            key = key, slice(None)
+        if len(key) != 2:
+            raise IndexError(f"ChunkedArray takes 2 indices, got {len(key)}.")
+
+        normalized = []
+        for index, size in zip(key, self.shape):
+            if isinstance(index, slice):
+                start, stop, step = index.indices(size)
+                if step != 1:
+                    raise IndexError("ChunkedArray slices must have a step of 1.")
+                normalized.append(slice(start, max(start, stop)))
+            else:
+                index = int(index)
+                if index < 0:
+                    index += size
+                if not 0 <= index < size:
+                    raise IndexError(f"Index {index} is out of bounds for size {size}.")
+                normalized.append(index)
+        return normalized[0], normalized[1]
+
+    def _overlapping_chunks(
+        self, x_slice: slice, y_slice: slice,
+    ) -> Iterator[Tuple[ChunkKey, Tuple[slice, slice], Tuple[slice, slice]]]:
+        """Yield each chunk overlapping a region, with the overlap as a window of the region and of the chunk."""
+        size = self.chunk_size
+        for chunk_x in range(x_slice.start // size, (x_slice.stop - 1) // size + 1):
+            x_lower = max(x_slice.start, chunk_x * size)
+            x_upper = min(x_slice.stop, (chunk_x + 1) * size)
+            for chunk_y in range(y_slice.start // size, (y_slice.stop - 1) // size + 1):
+                y_lower = max(y_slice.start, chunk_y * size)
+                y_upper = min(y_slice.stop, (chunk_y + 1) * size)
+                yield (
+                    (chunk_x, chunk_y),
+                    (slice(x_lower - x_slice.start, x_upper - x_slice.start),
+                     slice(y_lower - y_slice.start, y_upper - y_slice.start)),
+                    (slice(x_lower - chunk_x * size, x_upper - chunk_x * size),
+                     slice(y_lower - chunk_y * size, y_upper - chunk_y * size)),
+                )
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, tuple) and len(key) == 2 and isinstance(key[0], np.ndarray):
+            return self._gather(np.asarray(key[0]), np.asarray(key[1]))
+
+        x, y = self._normalize(key)
+        if not isinstance(x, slice) and not isinstance(y, slice):
+            chunk = self._read_chunk((x // self.chunk_size, y // self.chunk_size))
+            if chunk is None:
+                return self.dtype.type(self.fill_value)
+            return self.dtype.type(chunk[x % self.chunk_size, y % self.chunk_size])
+
+        x_slice = x if isinstance(x, slice) else slice(x, x + 1)
+        y_slice = y if isinstance(y, slice) else slice(y, y + 1)
+        result = np.full(
+            (x_slice.stop - x_slice.start, y_slice.stop - y_slice.start),
+            fill_value=self.fill_value, dtype=self.dtype, order="F",
+        )
+        if result.size:
+            for chunk_key, result_window, chunk_window in self._overlapping_chunks(x_slice, y_slice):
+                chunk = self._read_chunk(chunk_key)
+                if chunk is not None:
+                    result[result_window] = chunk[chunk_window]
+
+        if not isinstance(x, slice):
+            return result[0, :]
+        if not isinstance(y, slice):
+            return result[:, 0]
+        return result
+
+    def _gather(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Return the values at the cells x[i], y[i]."""
+        result = np.full(x.shape, fill_value=self.fill_value, dtype=self.dtype)
+        if not x.size:
+            return result
+        chunk_x, chunk_y = x // self.chunk_size, y // self.chunk_size
+        for key in set(zip(chunk_x.tolist(), chunk_y.tolist())):
+            chunk = self._read_chunk(key)
+            if chunk is not None:
+                in_chunk = (chunk_x == key[0]) & (chunk_y == key[1])
+                result[in_chunk] = chunk[x[in_chunk] % self.chunk_size, y[in_chunk] % self.chunk_size]
+        return result
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        x, y = self._normalize(key)
+        if not isinstance(x, slice) and not isinstance(y, slice):
+            chunk = self._get_chunk((x // self.chunk_size, y // self.chunk_size), create=value != self.fill_value)
+            if chunk is not None:
+                chunk[x % self.chunk_size, y % self.chunk_size] = value
+            return
+
+        x_slice = x if isinstance(x, slice) else slice(x, x + 1)
+        y_slice = y if isinstance(y, slice) else slice(y, y + 1)
+        if x_slice.stop == x_slice.start or y_slice.stop == y_slice.start:
+            return
+        value = np.asarray(value, dtype=self.dtype)
+        if not isinstance(x, slice) and value.ndim == 1:
+            value = value[np.newaxis, :]
+        elif not isinstance(y, slice) and value.ndim == 1:
+            value = value[:, np.newaxis]
+        value = np.broadcast_to(value, (x_slice.stop - x_slice.start, y_slice.stop - y_slice.start))
+
+        for chunk_key, value_window, chunk_window in self._overlapping_chunks(x_slice, y_slice):
+            part = value[value_window]
+            # Writing fill_value where nothing was allocated changes nothing, so it allocates nothing.
+            chunk = self._get_chunk(chunk_key, create=bool((part != self.fill_value).any()))
+            if chunk is not None:
+                chunk[chunk_window] = part
+
+    def lookup(self, table: np.ndarray) -> ChunkedArray:
+        """Return a ChunkedArray of table[value] for each value of this one, which must hold indices of table."""
+        result = ChunkedArray(self.shape, table.dtype, table[self.fill_value], self.chunk_size)
+        for key in self.chunk_keys():
+            result.chunks[key] = np.asfortranarray(table[self._read_chunk(key)])
+        return result
@@ -1,11 +1,7 @@
 from __future__ import annotations
 
-import random
 from typing import List, Optional, Tuple, TYPE_CHECKING
 
-import numpy as np  # type: ignore
-import tcod
-
 from actions import Action, BumpAction, MeleeAction, MovementAction, WaitAction
 
 if TYPE_CHECKING:
@@ -16,31 +12,44 @@ class BaseAI(Action):
     def perform(self) -> None:
         raise NotImplementedError()
 
+    @property
+    def is_idle(self) -> bool:
+        """True if this AI has nothing to do unless it sees the player, so its actor may be put to sleep."""
+        return False
+
+    def hear_noise(self, x: int, y: int) -> None:
+        """Called when a noise at x, y wakes this AI's actor from its sleep."""
+        pass
+
+    def clone(self, entity: Actor) -> BaseAI:
+        """Return a copy of this AI driving `entity`."""
+        clone = object.__new__(type(self))
+        clone.__dict__ = self.__dict__.copy()
+        clone.entity = entity
+        return clone
+
     def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
         """Compute and return a path to the target position.
 
         If there is no valid path then returns an empty list.
         """
-        # Copy the walkable array.
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
+        pathfinder = self.entity.gamemap.get_pathfinder_to(self.entity.x, self.entity.y)  # Start position.
 
-        for entity in self.entity.gamemap.entities:
-            # Check that an enitiy blocks movement and the cost isn't zero (blocking.)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position.
-                # A lower number means more enemies will crowd behind each other in
-                # hallways.  A higher number means enemies will take longer paths in
-                # order to surround the player.
-                cost[entity.x, entity.y] += 10
+        # Compute the path to the destination and remove the starting point.
+        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
 
-        # Create a graph from the cost array and pass that graph to a new pathfinder.
-        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
-        pathfinder = tcod.path.Pathfinder(graph)
+        # Convert from List[List[int]] to List[Tuple[int, int]].
+        return [(index[0], index[1]) for index in path]
 
-        pathfinder.add_root((self.entity.x, self.entity.y))  # Start position.
+    def get_path_to_player(self) -> List[Tuple[int, int]]:
+        """Return a path to the player by walking downhill on the engine's shared distance map.
 
-        # Compute the path to the destination and remove the starting point.
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
+        If there is no valid path then returns an empty list.
+        """
+        pathfinder = self.engine.get_player_pathfinder()
+
+        # Compute the path from this entity and remove the starting point.
+        path: List[List[int]] = pathfinder.path_from((self.entity.x, self.entity.y))[1:].tolist()
 
         # Convert from List[List[int]] to List[Tuple[int, int]].
         return [(index[0], index[1]) for index in path]
@@ -51,6 +60,20 @@ class HostileEnemy(BaseAI):
         super().__init__(entity)
         self.path: List[Tuple[int, int]] = []
 
+    @property
+    def is_idle(self) -> bool:
+        return not self.path
+
+    def hear_noise(self, x: int, y: int) -> None:
+        # Go and see what made the noise, unless already chasing something.
+        if not self.path:
+            self.path = self.get_path_to(x, y)
+
+    def clone(self, entity: Actor) -> HostileEnemy:
+        clone = super().clone(entity)
+        clone.path = list(self.path)
+        return clone
+
     def perform(self) -> None:
         target = self.engine.player
         dx = target.x - self.entity.x
@@ -61,7 +84,7 @@ class HostileEnemy(BaseAI):
             if distance <= 1:
                 return MeleeAction(self.entity, dx, dy).perform()
 
-            self.path = self.get_path_to(target.x, target.y)
+            self.path = self.get_path_to_player()
 
         if self.path:
             dest_x, dest_y = self.path.pop(0)
@@ -86,6 +109,12 @@ class ConfusedEnemy(BaseAI):
         self.previous_ai = previous_ai
         self.turns_remaining = turns_remaining
 
+    def clone(self, entity: Actor) -> ConfusedEnemy:
+        clone = super().clone(entity)
+        if self.previous_ai:
+            clone.previous_ai = self.previous_ai.clone(entity)
+        return clone
+
     def perform(self) -> None:
         # Revert the AI back to the original state if the effect has run its course.
         if self.turns_remaining <= 0:
@@ -95,7 +124,7 @@ class ConfusedEnemy(BaseAI):
             self.entity.ai = self.previous_ai
         else:
             # Pick a random direction
-            direction_x, direction_y = random.choice(
+            direction_x, direction_y = self.engine.rng.ai.choice(
                 [
                     (-1, -1),  # Northwest
                     (0, -1),  # North
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TypeVar, TYPE_CHECKING
+
+from slotted import Slotted
 
 if TYPE_CHECKING:
     from engine import Engine
     from entity import Entity
     from game_map import GameMap
 
+C = TypeVar("C", bound="BaseComponent")
+
+
+class BaseComponent(Slotted):
+    __slots__ = ("parent",)
 
-class BaseComponent:
     parent: Entity  # Owning entity instance.
 
     @property
@@ -18,3 +24,12 @@ class BaseComponent:
     @property
     def engine(self) -> Engine:
         return self.gamemap.engine
+
+    def clone(self: C, parent: Entity) -> C:
+        """Return a copy of this component owned by `parent`.
+
+        Attributes are copied shallowly, components holding mutable state copy it in their own clone.
+        """
+        clone = self.copy_slots()
+        clone.parent = parent
+        return clone
@@ -8,17 +8,21 @@ import components.ai
 import components.inventory
 from components.base_component import BaseComponent
 from exceptions import Impossible
-from kivy_input_handlers import (
-    ActionOrHandler,
-    AreaRangedAttackHandler,
-    SingleRangedAttackHandler,
-)
+
+FIREBALL_NOISE_RANGE = 15  # How far past its blast radius an exploding fireball wakes dormant actors
 
 if TYPE_CHECKING:
     from entity import Actor, Item
+    from kivy_input_handlers import (
+        ActionOrHandler,
+        AreaRangedAttackHandler,
+        SingleRangedAttackHandler,
+    )
 
 
 class Consumable(BaseComponent):
+    __slots__ = ()
+
     parent: Item
 
     def get_action(self, consumer: Actor) -> Optional[ActionOrHandler]:
@@ -41,10 +45,14 @@ class Consumable(BaseComponent):
 
 
 class ConfusionConsumable(Consumable):
+    __slots__ = ("number_of_turns",)
+
     def __init__(self, number_of_turns: int):
         self.number_of_turns = number_of_turns
 
     def get_action(self, consumer: Actor) -> SingleRangedAttackHandler:
+        from kivy_input_handlers import SingleRangedAttackHandler  # the targeting handlers need Kivy
+
         self.engine.message_log.add_message(
             "Select a target location.", color.needs_target
         )
@@ -75,11 +83,15 @@ class ConfusionConsumable(Consumable):
 
 
 class FireballDamageConsumable(Consumable):
+    __slots__ = ("damage", "radius")
+
     def __init__(self, damage: int, radius: int):
         self.damage = damage
         self.radius = radius
 
     def get_action(self, consumer: Actor) -> AreaRangedAttackHandler:
+        from kivy_input_handlers import AreaRangedAttackHandler  # the targeting handlers need Kivy
+
         self.engine.message_log.add_message(
             "Select a target location.", color.needs_target
         )
@@ -96,20 +108,22 @@ class FireballDamageConsumable(Consumable):
             raise Impossible("You cannot target an area that you cannot see.")
 
         targets_hit = False
-        for actor in self.engine.game_map.actors:
-            if actor.distance(*target_xy) <= self.radius:
-                self.engine.message_log.add_message(
-                    f"The {actor.name} is engulfed in a fiery explosion, taking {self.damage} damage!"
-                )
-                actor.fighter.take_damage(self.damage)
-                targets_hit = True
+        for actor in self.engine.game_map.get_actors_in_radius(*target_xy, self.radius):
+            self.engine.message_log.add_message(
+                f"The {actor.name} is engulfed in a fiery explosion, taking {self.damage} damage!"
+            )
+            actor.fighter.take_damage(self.damage)
+            targets_hit = True
 
         if not targets_hit:
             raise Impossible("There are no targets in the radius.")
+        self.engine.game_map.make_noise(*target_xy, self.radius + FIREBALL_NOISE_RANGE)
         self.consume()
 
 
 class HealingConsumable(Consumable):
+    __slots__ = ("amount",)
+
     def __init__(self, amount: int):
         self.amount = amount
 
@@ -128,22 +142,18 @@ class HealingConsumable(Consumable):
 
 
 class LightningDamageConsumable(Consumable):
+    __slots__ = ("damage", "maximum_range")
+
     def __init__(self, damage: int, maximum_range: int):
         self.damage = damage
         self.maximum_range = maximum_range
 
     def activate(self, action: actions.ItemAction) -> None:
         consumer = action.entity
-        target = None
-        closest_distance = self.maximum_range + 1.0
-
-        for actor in self.engine.game_map.actors:
-            if actor is not consumer and self.parent.gamemap.visible[actor.x, actor.y]:
-                distance = consumer.distance(actor.x, actor.y)
-
-                if distance < closest_distance:
-                    target = actor
-                    closest_distance = distance
+        game_map = self.engine.game_map
+        target = game_map.get_nearest_actor(
+            consumer.x, consumer.y, self.maximum_range + 1.0, mask=game_map.visible, exclude=consumer,
+        )
 
         if target:
             self.engine.message_log.add_message(
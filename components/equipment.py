@@ -10,12 +10,28 @@ if TYPE_CHECKING:
 
 
 class Equipment(BaseComponent):
+    __slots__ = ("weapon", "armor")
+
     parent: Actor
 
     def __init__(self, weapon: Optional[Item] = None, armor: Optional[Item] = None):
         self.weapon = weapon
         self.armor = armor
 
+    def clone(self, parent: Actor) -> Equipment:
+        """Copy this equipment onto `parent`, whose inventory must already be a clone of this one's owner's."""
+        clone = super().clone(parent)
+        for slot in ("weapon", "armor"):
+            item = getattr(self, slot)
+            if item is not None:
+                # Equip the clone of the item held in the inventory, at the same position.
+                if hasattr(self, "parent") and item in self.parent.inventory.items:
+                    item = parent.inventory.items[self.parent.inventory.items.index(item)]
+                else:
+                    item = item.clone()
+                setattr(clone, slot, item)
+        return clone
+
     @property
     def defense_bonus(self) -> int:
         bonus = 0
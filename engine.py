@@ -1,36 +1,68 @@
 from __future__ import annotations
 
-import lzma
-import pickle
-from typing import Tuple, TYPE_CHECKING
+from typing import Optional, Tuple, TYPE_CHECKING
 
 from tcod.map import compute_fov
+import tcod.path
 
+import color
 import exceptions
-from gui.graphics_component import GraphicsFrame
 from message_log import MessageLog
+import save_format
+from scheduler import action_delay
+
+FOV_RADIUS = 8  # How far the player sees
 
 if TYPE_CHECKING:
+    from actions import Action
+    from autosave import Autosaver
     from entity import Actor
     from game_map import GameMap, GameWorld
+    from gui.graphics_component import GraphicsFrame
+    from journal import Journal
+    from replay import ReplayRecorder
+    from rng_streams import RngStreams
     from kivy.uix.widget import Widget
 
 
 class Engine:
     game_map: GameMap
     game_world: GameWorld
-    graphics_component: GraphicsFrame
+    graphics_component: Optional[GraphicsFrame] = None  # None while running headless
     mouse_location: Tuple[int, int] = (0, 0)
     map_location: Tuple[int, int] = (0, 0)
     temp_location: Tuple[int, int] = None
+    player_pathfinder: Optional[tcod.path.Pathfinder] = None
+    rng: Optional[RngStreams] = None  # Random streams of the game, see rng_streams.py
+    autosaver: Optional[Autosaver] = None  # Saves the game every few turns while it is played
+    journal: Optional[Journal] = None  # Journals the turns taken since the last save
+    recorder: Optional[ReplayRecorder] = None  # Records the game's inputs to a replay file
+    turn = 0  # Turns the player took
 
     def __init__(self, player: Actor):
         self.message_log = MessageLog()
         self.player = player
-        self.graphics_component = GraphicsFrame(self)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # The frontend, the autosaver, the journal and the recorder are not part of the game.
+        state.pop("graphics_component", None)
+        state.pop("autosaver", None)
+        state.pop("journal", None)
+        state.pop("recorder", None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        # GameMap does not pickle its engine.
+        if "game_map" in state:
+            self.game_map.engine = self
 
     def add_graphics_component(self, root_widget: Widget) -> None:
         if not self.graphics_component:
+            # Imported here so the game logic can run without Kivy
+            from gui.graphics_component import GraphicsFrame
+
             self.graphics_component = GraphicsFrame(self)
 
         if self.graphics_component in root_widget.children:
@@ -38,13 +70,73 @@ class Engine:
 
         root_widget.add_widget(self.graphics_component)
 
+    def handle_action(self, action: Optional[Action]) -> bool:
+        """Perform the player's action, then the enemy turns.
+
+        Returns True if the action will advance a turn.
+        """
+        if action is None:
+            return False
+
+        if self.journal:
+            self.journal.begin_turn(self, action)
+        if self.recorder:
+            self.recorder.begin_turn(self, action)
+        try:
+            action.perform()
+        except exceptions.Impossible as exc:
+            self.message_log.add_message(exc.args[0], color.impossible)
+            return False  # Skip enemy turn on exceptions.
+
+        self.handle_enemy_turns()
+
+        self.update_fov()
+        self.game_map.unload_far_chunks(self.player.x, self.player.y)
+
+        self.turn += 1
+        if self.journal:
+            self.journal.end_turn(self)
+        if self.recorder:
+            self.recorder.end_turn(self)
+        if self.autosaver:
+            self.autosaver.on_turn(self)
+        return True
+
     def handle_enemy_turns(self) -> None:
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
+        """Let every actor whose action comes due during the player's turn act.
+
+        Idle actors far from the player, or on unexplored tiles, are put to sleep instead, and idle actors outside the
+        scheduler's active radius only act every few turns.  See scheduler.py.
+        """
+        game_map = self.game_map
+        scheduler = game_map.scheduler
+        player_x, player_y = self.player.x, self.player.y
+        scheduler.wake_near_player(player_x, player_y, game_map.explored)
+        try:
+            for entity in scheduler.due_actors(scheduler.time + action_delay(self.player)):
+                if entity is self.player:
+                    continue  # The player acts through handle_action and is left out of the schedule.
+                if entity.ai.is_idle and scheduler.should_sleep(entity, player_x, player_y, game_map.explored):
+                    scheduler.sleep(entity)
+                    continue
                 try:
                     entity.ai.perform()
                 except exceptions.Impossible:
                     pass  # Ignore impossible action exceptions from AI.
+                if entity in game_map.entities:
+                    scheduler.schedule(entity, coarse=scheduler.is_coarse(entity, player_x, player_y))
+        finally:
+            # The distance map only holds for the turn it was built in.
+            self.player_pathfinder = None
+
+    def get_player_pathfinder(self) -> tcod.path.Pathfinder:
+        """Return this turn's distance to the player map, building it on first use.
+
+        Every enemy shares the same map and walks downhill on it, so the map is built at most once per enemy turn.
+        """
+        if self.player_pathfinder is None:
+            self.player_pathfinder = self.game_map.get_pathfinder_to(self.player.x, self.player.y)
+        return self.player_pathfinder
 
     def normalize_mouse_pos(self, root_widget: Widget) -> None:
         # Changes the mouse location from floats, to tile coordinates on screen
@@ -71,7 +163,7 @@ class Engine:
         self.temp_location = None
 
     def update_map_location(self, x: int, y: int) -> None:
-        y_offset = int(self.graphics_component.game_window.y / 32)
+        y_offset = int(self.graphics_component.game_window.y / 32) if self.graphics_component else 0
         map_x_offset = 10
         map_y_offset = 10
 
@@ -86,15 +178,35 @@ class Engine:
     def get_map_location(self) -> Tuple[int, int]:
         return self.map_location
 
+    def fov_window(self, x: int, y: int) -> Tuple[slice, slice]:
+        """Return the slices of the map holding every tile the player could see from x, y."""
+        return (
+            slice(max(x - FOV_RADIUS, 0), min(x + FOV_RADIUS + 1, self.game_map.width)),
+            slice(max(y - FOV_RADIUS, 0), min(y + FOV_RADIUS + 1, self.game_map.height)),
+        )
+
     def update_fov(self) -> None:
         """Recompute the visible area based on the players point of view."""
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius=8,
+        origin = self.player.x, self.player.y
+        if not self.game_map.fov_dirty and self.game_map.fov_origin == origin:
+            return  # Neither the player nor any see-through tile changed since the last update.
+
+        game_map = self.game_map
+        if game_map.fov_origin is not None:
+            game_map.visible[self.fov_window(*game_map.fov_origin)] = False
+
+        # Only the tiles within the radius can be seen, so the field of view is computed over a window around them.
+        window = self.fov_window(*origin)
+        game_map.visible[window] = compute_fov(
+            game_map.transparent[window],
+            (origin[0] - window[0].start, origin[1] - window[1].start),
+            radius=FOV_RADIUS,
         )
         # If a tile is "visible" it should be added to "explored".
-        self.game_map.explored |= self.game_map.visible
+        game_map.explored[window] = game_map.explored[window] | game_map.visible[window]
+
+        game_map.fov_origin = origin
+        game_map.fov_dirty = False
 
     def render(self, root_widget: Widget, dt: float) -> None:
         self.normalize_mouse_pos(root_widget)
@@ -105,8 +217,7 @@ class Engine:
         self.graphics_component = None
 
     def save_as(self, filename: str) -> None:
-        """Save this Engine instance as a compressed file."""
-        self.disconnect_graphics_component()
-        save_data = lzma.compress(pickle.dumps(self))
-        with open(filename, "wb") as f:
-            f.write(save_data)
+        """Save this Engine instance to a file, see save_format.py."""
+        if self.autosaver:
+            self.autosaver.wait(self)  # So an autosave being written cannot land over this save.
+        save_format.save(self, filename)
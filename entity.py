@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-import copy
 from enum import Enum
 import math
 from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING, Union
 
 from render_order import RenderOrder
+from scheduler import NORMAL_SPEED
+from slotted import Slotted
 
 if TYPE_CHECKING:
     from components.ai import BaseAI
@@ -25,11 +26,16 @@ class Direction(Enum):
     RIGHT = 2
 
 
-class Entity:
+class Entity(Slotted):
     """
     A generic object to represent players, enemies, items, etc.
     """
 
+    __slots__ = (
+        "x", "y", "char", "color", "minimap_color", "name", "name2", "blocks_movement", "render_order", "direction",
+        "animation_index", "ai", "parent",
+    )
+
     parent: Union[GameMap, Inventory]
 
     def __init__(
@@ -60,7 +66,7 @@ class Entity:
         if parent:
             # If parent isn't provided now then it will be set later.
             self.parent = parent
-            parent.entities.add(self)
+            parent.add_entity(self)
 
     @property
     def gamemap(self) -> GameMap:
@@ -71,25 +77,40 @@ class Entity:
         """Returns True as long as this actor can perform actions."""
         return bool(self.ai)
 
+    def clone(self: T) -> T:
+        """Return a copy of this entity, and of its components, that is not placed anywhere.
+
+        Only what an entity owns is copied, unlike copy.deepcopy which also walks everything it refers to.
+        """
+        clone = self.copy_slots()
+        if hasattr(clone, "parent"):
+            del clone.parent
+        return clone
+
     def spawn(self: T, gamemap: GameMap, x: int, y: int) -> T:
         """Spawn a copy of this instance at the given location."""
-        clone = copy.deepcopy(self)
+        clone = self.clone()
         clone.x = x
         clone.y = y
         clone.parent = gamemap
-        gamemap.entities.add(clone)
+        gamemap.add_entity(clone)
         return clone
 
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
         """Place this entitiy at a new location.  Handles moving across GameMaps."""
-        self.x = x
-        self.y = y
+        on_map = hasattr(self, "parent") and self.parent is self.gamemap  # Possibly uninitialized.
         if gamemap:
-            if hasattr(self, "parent"):  # Possibly uninitialized.
-                if self.parent is self.gamemap:
-                    self.gamemap.entities.remove(self)
+            if on_map:
+                self.gamemap.remove_entity(self)
+            self.x = x
+            self.y = y
             self.parent = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
+        elif on_map:
+            self.gamemap.move_entity(self, x, y)
+        else:
+            self.x = x
+            self.y = y
 
     def distance(self, x: int, y: int) -> float:
         """
@@ -99,8 +120,7 @@ class Entity:
 
     def move(self, dx: int, dy: int) -> None:
         # Move the entity by a given amount
-        self.x += dx
-        self.y += dy
+        self.place(self.x + dx, self.y + dy)
 
     def update_direction(self, direction_x: int) -> None:
         # Update Horizontal Direction Based on Target X-Position
@@ -111,6 +131,8 @@ class Entity:
 
 
 class Actor(Entity):
+    __slots__ = ("speed", "equipment", "fighter", "inventory", "level")
+
     def __init__(
         self,
         *,
@@ -126,6 +148,7 @@ class Actor(Entity):
         fighter: Fighter,
         inventory: Inventory,
         level: Level,
+        speed: int = NORMAL_SPEED,
     ):
         super().__init__(
             x=x,
@@ -140,6 +163,7 @@ class Actor(Entity):
         )
 
         self.ai: Optional[BaseAI] = ai_cls(self)
+        self.speed = speed  # Energy gained per tick, see scheduler.py
 
         self.equipment: Equipment = equipment
         self.equipment.parent = self
@@ -153,8 +177,19 @@ class Actor(Entity):
         self.level = level
         self.level.parent = self
 
+    def clone(self) -> Actor:
+        clone = super().clone()
+        clone.ai = self.ai.clone(clone) if self.ai else None
+        clone.fighter = self.fighter.clone(clone)
+        clone.level = self.level.clone(clone)
+        clone.inventory = self.inventory.clone(clone)
+        clone.equipment = self.equipment.clone(clone)  # After the inventory, it equips the cloned items.
+        return clone
+
 
 class Item(Entity):
+    __slots__ = ("consumable", "equippable")
+
     def __init__(
         self,
         *,
@@ -189,3 +224,11 @@ class Item(Entity):
 
         if self.equippable:
             self.equippable.parent = self
+
+    def clone(self) -> Item:
+        clone = super().clone()
+        if self.consumable:
+            clone.consumable = self.consumable.clone(clone)
+        if self.equippable:
+            clone.equippable = self.equippable.clone(clone)
+        return clone
@@ -1,10 +1,12 @@
+from typing import Dict
+
 from components.ai import HostileEnemy
 from components import consumable, equippable
 from components.equipment import Equipment
 from components.fighter import Fighter
 from components.inventory import Inventory
 from components.level import Level
-from entity import Actor, Item
+from entity import Actor, Entity, Item
 
 
 player = Actor(
@@ -113,3 +115,18 @@ chain_mail = Item(
     name2="chain_mail",
     equippable=equippable.ChainMail()
 )
+
+# Every template above by its name2, the name its textures are stored under
+PROTOTYPES: Dict[str, Entity] = {
+    prototype.name2: prototype
+    for prototype in (
+        player, orc, troll,
+        confusion_scroll, fireball_scroll, health_potion, lightning_scroll,
+        dagger, sword, leather_armor, chain_mail,
+    )
+}
+
+
+def create(name: str) -> Entity:
+    """Return a new entity, not placed anywhere, cloned from the prototype with the given name2."""
+    return PROTOTYPES[name].clone()
@@ -0,0 +1,143 @@
+"""
+entity_table.py
+Columnar copy of the entities on a GameMap, for queries that look at all of them at once.
+
+Each entity has a row holding its x, y, blocks_movement, render_order, alive and kind in numpy arrays, so systems can
+build masks such as "visible & alive & in the viewport" over every entity in a few vectorized operations instead of
+reading attributes one object at a time.  The rows are kept in sync by GameMap.add_entity, remove_entity,
+move_entity and update_entity.  Removed rows are filled with the last row, so the table stays packed.
+"""
+from __future__ import annotations
+
+from enum import auto, Enum
+from typing import Dict, List, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+from entity import Actor, Item
+
+if TYPE_CHECKING:
+    from entity import Entity
+
+
+class EntityKind(Enum):
+    ENTITY = auto()
+    ACTOR = auto()
+    ITEM = auto()
+
+
+COLUMN_TYPES = {
+    "x": np.int32,
+    "y": np.int32,
+    "blocks_movement": np.bool_,
+    "render_order": np.int8,  # RenderOrder value
+    "alive": np.bool_,
+    "kind": np.int8,  # EntityKind value
+}
+
+
+def entity_kind(entity: Entity) -> EntityKind:
+    if isinstance(entity, Actor):
+        return EntityKind.ACTOR
+    if isinstance(entity, Item):
+        return EntityKind.ITEM
+    return EntityKind.ENTITY
+
+
+class EntityTable:
+    def __init__(self, capacity: int = 16):
+        self.entities: List[Entity] = []  # The entity of each row
+        self.rows: Dict[Entity, int] = {}
+        # Columns are allocated for `capacity` rows and doubled when full, only the first len(self) rows are used.
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMN_TYPES.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __contains__(self, entity: Entity) -> bool:
+        return entity in self.rows
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a view of the used rows of a column."""
+        return self.columns[name][: len(self.entities)]
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.column("x")
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.column("y")
+
+    @property
+    def blocks_movement(self) -> np.ndarray:
+        return self.column("blocks_movement")
+
+    @property
+    def render_order(self) -> np.ndarray:
+        return self.column("render_order")
+
+    @property
+    def alive(self) -> np.ndarray:
+        return self.column("alive")
+
+    @property
+    def kind(self) -> np.ndarray:
+        return self.column("kind")
+
+    def add(self, entity: Entity) -> None:
+        row = len(self.entities)
+        if row == len(self.columns["x"]):
+            for name, column in self.columns.items():
+                self.columns[name] = np.concatenate([column, np.zeros_like(column)])
+        self.rows[entity] = row
+        self.entities.append(entity)
+        self.columns["kind"][row] = entity_kind(entity).value
+        self.update(entity)
+
+    def remove(self, entity: Entity) -> None:
+        # Move the last row into the removed one, so the rows stay packed.
+        row = self.rows.pop(entity)
+        last_entity = self.entities.pop()
+        if last_entity is not entity:
+            self.entities[row] = last_entity
+            self.rows[last_entity] = row
+            last_row = len(self.entities)
+            for column in self.columns.values():
+                column[row] = column[last_row]
+
+    def move(self, entity: Entity) -> None:
+        """Copy the entity's location to its row."""
+        row = self.rows[entity]
+        self.columns["x"][row] = entity.x
+        self.columns["y"][row] = entity.y
+
+    def update(self, entity: Entity) -> None:
+        """Copy every attribute of the entity to its row."""
+        row = self.rows[entity]
+        self.move(entity)
+        self.columns["blocks_movement"][row] = entity.blocks_movement
+        self.columns["render_order"][row] = entity.render_order.value
+        self.columns["alive"][row] = entity.is_alive
+
+    def in_rect(self, x_lower: int, x_upper: int, y_lower: int, y_upper: int) -> np.ndarray:
+        """Return a mask of the entities with x_lower <= x < x_upper and y_lower <= y < y_upper."""
+        x, y = self.x, self.y
+        return (x_lower <= x) & (x < x_upper) & (y_lower <= y) & (y < y_upper)
+
+    def on_tiles(self, tile_mask: np.ndarray) -> np.ndarray:
+        """Return a mask of the entities standing on a True tile of a map sized boolean array, such as `visible`."""
+        return tile_mask[self.x, self.y]
+
+    def of_kind(self, kind: EntityKind) -> np.ndarray:
+        return self.kind == kind.value
+
+    def select(self, mask: np.ndarray) -> List[Entity]:
+        """Return the entities of the rows where mask is True, in row order."""
+        return [self.entities[row] for row in np.flatnonzero(mask)]
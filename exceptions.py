@@ -7,3 +7,11 @@ class Impossible(Exception):
 
 class QuitWithoutSaving(SystemExit):
     """Can be raised to exit the game without automatically saving."""
+
+
+class SaveFormatError(Exception):
+    """Exception raised when a save file is damaged or was written by a newer version of the game."""
+
+
+class ReplayDrift(Exception):
+    """Exception raised when a replayed game no longer plays out as it was recorded."""
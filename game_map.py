@@ -1,11 +1,22 @@
 from __future__ import annotations
 
-from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import pickle
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING
+import zlib
 
 import numpy as np  # type: ignore
 from tcod.console import Console
+import tcod.path
 
+from bitmasking import Bitmasking
+from chunked_array import CHUNK_SIZE, ChunkedArray
 from entity import Actor, Item
+from entity_table import EntityKind, EntityTable
+import globals
+from rng_streams import floor_stream
+from scheduler import TurnScheduler
 import tile_types
 
 
@@ -13,6 +24,17 @@ if TYPE_CHECKING:
     from engine import Engine
     from entity import Entity
 
+MAX_LIVE_FLOORS = 3  # Visited floors kept live, including the current one
+LIVE_FLOOR_BUDGET = 64 * 1024 * 1024  # Bytes of map arrays the live floors may take
+SNAPSHOT_BUDGET = 32 * 1024 * 1024  # Bytes the compressed floor snapshots may take
+
+CHUNKED_MAP_AREA = 2048 * 2048  # Maps with more tiles than this are stored in chunks, see ChunkedGameMap
+UNLOAD_CHUNK_RADIUS = 4  # Chunks of a ChunkedGameMap further than this many chunks from the player are spilled to disk
+PATHING_RADIUS = 48  # How far from their root the pathfinders of a ChunkedGameMap reach
+
+# Generates the next floor in the background while the current one is played
+floor_generator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="floor_generator")
+
 
 class GameMap:
     def __init__(
@@ -20,37 +42,83 @@ class GameMap:
     ):
         self.engine = engine
         self.width, self.height = width, height
-        self.entities = set(entities)
-        self.tiles = np.full((width, height), fill_value=tile_types.wall, order="F")
-        self.walkable_bitmasking = np.full(
-            (width, height), fill_value=False, order="F"
-        )
+        self.entities = set()
+        # Tile keyed index of every entity on this map, kept current by add/remove/move_entity.
+        self.entity_locations: Dict[Tuple[int, int], List[Entity]] = {}
+        self.scheduler = TurnScheduler()  # When each actor on this map acts next
+        # Columnar copy of the entities' positions and flags, for vectorized queries over all of them.
+        self.entity_table = EntityTable()
+        for entity in entities:
+            self.add_entity(entity)
+        # ID of each cell's tile in tile_types.TILES.  Edit it through set_tile, or call refresh_tile_views after
+        # writing it directly.
+        self.tile_ids = self.new_array(np.uint8, tile_types.WALL)
+        # Wall masks of the tiles.  BLANK_TILE is also the mask of a wall with walls all around.
+        self.walkable_bitmasking = self.new_array(np.int16, Bitmasking.BLANK_TILE)
         # print(self.walkable_bitmasking)
 
-        # print(self.tiles['walkable'])
-
-        # self.walkable = np.full(
-        #     (width, height), fill_value=False, order="F"
-        # )  # Tiles that can't be walked through
-        #
-        # self.transparent = np.full(
-        #     (width, height), fill_value=False, order="F"
-        # )  # Tiles that can't be seen through, but can be walked through
+        # Views of tile_ids through the tile table, only rebuilt when tiles change.
+        self.walkable = self.new_array(bool, False)  # Tiles that can be walked through
+        self.transparent = self.new_array(bool, False)  # Tiles that can be seen through
 
-        self.visible = np.full(
-            (width, height), fill_value=False, order="F"
-        )  # Tiles the player can currently see
+        self.visible = self.new_array(bool, False)  # Tiles the player can currently see
 
-        self.explored = np.full(
-            (width, height), fill_value=False, order="F"
-        )  # Tiles the player has seen before
+        self.explored = self.new_array(bool, False)  # Tiles the player has seen before
 
+        self.start_location = (0, 0)  # Where the player is placed when the floor is first entered
         self.downstairs_location = (0, 0)
+        self.upstairs_location: Optional[Tuple[int, int]] = None  # None on the first floor
+
+        # Caches that depend on the tiles.  Edits made through set_tile mark them dirty only when they are affected.
+        self.fov_dirty = True
+        self.fov_origin: Optional[Tuple[int, int]] = None  # Where the current "visible" array was computed from.
+        self.pathing_cost_dirty = True
+        self.walkable_cost = self.new_array(np.int8, 0)
+
+    def __getstate__(self) -> dict:
+        # A map is pickled on its own for the floor store, so it must not drag the engine along.
+        state = self.__dict__.copy()
+        state["engine"] = None
+        # Rebuilt from tile_ids when loaded
+        del state["walkable"], state["transparent"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.refresh_tile_views()
 
     @property
     def gamemap(self) -> GameMap:
         return self
 
+    def new_array(self, dtype: Any, fill_value: Any) -> np.ndarray:
+        """Return a width by height array for a per tile property of this map, filled with fill_value."""
+        return np.full((self.width, self.height), fill_value=fill_value, dtype=dtype, order="F")
+
+    def lookup_tiles(self, table: np.ndarray) -> np.ndarray:
+        """Return table[tile_id] for every tile, where table is a per tile ID lookup table from tile_types."""
+        return np.asfortranarray(table[self.tile_ids])
+
+    @property
+    def tiles(self) -> np.ndarray:
+        """The tile_dt record of every cell, looked up from tile_ids.
+
+        This is a read-only copy, edit the map through set_tile or tile_ids.
+        """
+        tiles = tile_types.TILES[self.tile_ids]
+        tiles.flags.writeable = False
+        return tiles
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes taken by this map's arrays."""
+        return sum(
+            array.nbytes for array in (
+                self.tile_ids, self.walkable, self.transparent, self.walkable_bitmasking, self.visible,
+                self.explored, self.walkable_cost,
+            )
+        ) + self.entity_table.nbytes
+
     @property
     def actors(self) -> Iterator[Actor]:
         """Iterate over this maps living actors."""
@@ -64,26 +132,233 @@ class GameMap:
     def items(self) -> Iterator[Item]:
         yield from (entity for entity in self.entities if isinstance(entity, Item))
 
+    def add_entity(self, entity: Entity) -> None:
+        """Add an entity to this map at its current location."""
+        self.entities.add(entity)
+        self.entity_locations.setdefault((entity.x, entity.y), []).append(entity)
+        self.entity_table.add(entity)
+        if isinstance(entity, Actor):
+            self.scheduler.schedule(entity)
+
+    def remove_entity(self, entity: Entity) -> None:
+        """Remove an entity from this map."""
+        self.entities.remove(entity)
+        self._unindex_entity(entity)
+        self.entity_table.remove(entity)
+        if isinstance(entity, Actor):
+            self.scheduler.unschedule(entity)
+
+    def move_entity(self, entity: Entity, x: int, y: int) -> None:
+        """Move an entity on this map to a new location, keeping the location index current."""
+        self._unindex_entity(entity)
+        entity.x, entity.y = x, y
+        self.entity_locations.setdefault((x, y), []).append(entity)
+        self.entity_table.move(entity)
+
+    def update_entity(self, entity: Entity) -> None:
+        """Refresh the entity table after an entity's blocks_movement, render_order or ai changed."""
+        self.entity_table.update(entity)
+
+    def _unindex_entity(self, entity: Entity) -> None:
+        location = entity.x, entity.y
+        entities_here = self.entity_locations[location]
+        entities_here.remove(entity)
+        if not entities_here:
+            del self.entity_locations[location]
+
+    def _actors_by_distance(
+        self, x: int, y: int, max_distance: float, mask: Optional[np.ndarray], inclusive: bool,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the entity table rows of the living actors within max_distance of x, y, and on a True tile of
+        mask, and their squared distances."""
+        table = self.entity_table
+        squared_distances = (table.x - x) ** 2 + (table.y - y) ** 2
+        if inclusive:
+            matches = squared_distances <= max_distance ** 2
+        else:
+            matches = squared_distances < max_distance ** 2
+        matches &= table.alive & table.of_kind(EntityKind.ACTOR)
+        if mask is not None:
+            matches &= table.on_tiles(mask)
+        rows = np.flatnonzero(matches)
+        return rows, squared_distances[rows]
+
+    def get_actors_in_radius(
+        self, x: int, y: int, radius: float, mask: Optional[np.ndarray] = None,
+    ) -> List[Actor]:
+        """Return the living actors within radius (Euclidean distance) of x, y.
+
+        If a mask is given, only actors on the tiles where it is True are returned, for example `self.visible`.
+        """
+        rows, _ = self._actors_by_distance(x, y, radius, mask, inclusive=True)
+        return [self.entity_table.entities[row] for row in rows]
+
+    def get_nearest_actor(
+        self,
+        x: int,
+        y: int,
+        max_distance: float,
+        mask: Optional[np.ndarray] = None,
+        exclude: Optional[Actor] = None,
+    ) -> Optional[Actor]:
+        """Return the living actor closest to x, y and closer than max_distance, or None.
+
+        If a mask is given, only actors on the tiles where it is True are considered.  `exclude` is never returned.
+        """
+        rows, squared_distances = self._actors_by_distance(x, y, max_distance, mask, inclusive=False)
+        for row in rows[np.argsort(squared_distances, kind="stable")]:
+            actor = self.entity_table.entities[row]
+            if actor is not exclude:
+                return actor
+
+        return None
+
+    def make_noise(self, x: int, y: int, radius: int) -> None:
+        """Wake the dormant actors within radius of x, y and let them hear the noise."""
+        for actor in self.scheduler.dormant_near(x, y, radius):
+            self.scheduler.wake(actor)
+            if actor.ai:
+                actor.ai.hear_noise(x, y)
+
+    def get_entities_at_location(self, x: int, y: int) -> List[Entity]:
+        """Return every entity at the given location."""
+        return list(self.entity_locations.get((x, y), ()))
+
     def get_blocking_entity_at_location(
         self, location_x: int, location_y: int,
     ) -> Optional[Entity]:
-        for entity in self.entities:
-            if (
-                entity.blocks_movement
-                and entity.x == location_x
-                and entity.y == location_y
-            ):
+        for entity in self.entity_locations.get((location_x, location_y), ()):
+            if entity.blocks_movement:
                 return entity
 
         return None
 
     def get_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
+        for entity in self.entity_locations.get((x, y), ()):
+            if isinstance(entity, Actor) and entity.is_alive:
+                return entity
 
         return None
 
+    def set_tile(self, x: int, y: int, tile_id: int) -> None:
+        """Change a single tile to the tile with the given ID in tile_types.TILES.
+
+        The wall bitmasking is recomputed around the tile only, and the field of view and pathing cost caches are
+        marked dirty only when the tile's transparency or walkability changed.
+        """
+        walkable = tile_types.TILE_WALKABLE[tile_id]
+        transparent = tile_types.TILE_TRANSPARENT[tile_id]
+        walkable_changed = self.walkable[x, y] != walkable
+        transparent_changed = self.transparent[x, y] != transparent
+
+        self.tile_ids[x, y] = tile_id
+        self.walkable[x, y] = walkable
+        self.transparent[x, y] = transparent
+
+        if walkable_changed:
+            self.refresh_bitmasking(x, y)
+            self.pathing_cost_dirty = True
+        if transparent_changed:
+            self.fov_dirty = True
+
+    def refresh_tile_views(self) -> None:
+        """Rebuild the walkable and transparent arrays, and mark the caches dirty, after tile_ids was written to.
+
+        The wall bitmasking is left as is.
+        """
+        self.walkable = self.lookup_tiles(tile_types.TILE_WALKABLE)
+        self.transparent = self.lookup_tiles(tile_types.TILE_TRANSPARENT)
+        self.fov_dirty = True
+        self.pathing_cost_dirty = True
+
+    def dig(self, x: int, y: int) -> None:
+        """Turn the tile at the given location into floor."""
+        self.set_tile(x, y, tile_types.FLOOR)
+
+    def build_wall(self, x: int, y: int) -> None:
+        """Turn the tile at the given location into wall."""
+        self.set_tile(x, y, tile_types.WALL)
+
+    def generate_bitmasking(self) -> None:
+        """Compute walkable_bitmasking for the whole map, once it has been generated."""
+        self.walkable_bitmasking = Bitmasking.generate(self.walkable)
+
+        # Reset all Values in a Perimeter around Map(weird bit masking issues)
+        Bitmasking.blank_perimeter(self.walkable_bitmasking)
+
+    def refresh_bitmasking(self, x: int, y: int) -> None:
+        """Recompute walkable_bitmasking for the 3x3 area around a tile."""
+        self.refresh_bitmasking_area(x - 1, x + 2, y - 1, y + 2)
+
+    def refresh_bitmasking_area(self, x_lower: int, x_upper: int, y_lower: int, y_upper: int) -> None:
+        """Recompute walkable_bitmasking for the tiles with x_lower <= x < x_upper and y_lower <= y < y_upper."""
+        x_lower, x_upper = max(x_lower, 0), min(x_upper, self.width)
+        y_lower, y_upper = max(y_lower, 0), min(y_upper, self.height)
+
+        # The mask of a tile depends on its neighbours, so read one more tile around the area.
+        window_x, window_y = max(x_lower - 1, 0), max(y_lower - 1, 0)
+        window = Bitmasking.generate(
+            self.walkable[window_x : min(x_upper + 1, self.width), window_y : min(y_upper + 1, self.height)]
+        )
+        self.walkable_bitmasking[x_lower:x_upper, y_lower:y_upper] = window[
+            x_lower - window_x : x_upper - window_x, y_lower - window_y : y_upper - window_y
+        ]
+
+        # Edits touching the perimeter or the bottom left corner need the perimeter values put back.
+        if (
+            x_lower == 0
+            or y_lower == 0
+            or x_upper == self.width
+            or y_upper == self.height
+            or (x_lower <= 2 and y_lower <= 2)
+        ):
+            Bitmasking.blank_perimeter(self.walkable_bitmasking)
+
+    def get_pathing_cost(
+        self, x_lower: int = 0, y_lower: int = 0, x_upper: Optional[int] = None, y_upper: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return the movement cost of the tiles from x_lower, y_lower up to x_upper, y_upper, the whole map by
+        default, with blocking entities made more expensive to walk through.
+        """
+        if self.pathing_cost_dirty:
+            self.walkable_cost[:] = self.walkable
+            self.pathing_cost_dirty = False
+
+        # Copy the walkable array.
+        cost = self.walkable_cost[x_lower:x_upper, y_lower:y_upper].copy(order="F")
+        self.add_blocking_costs(cost, x_lower, y_lower)
+        return cost
+
+    def add_blocking_costs(self, cost: np.ndarray, x_lower: int = 0, y_lower: int = 0) -> None:
+        """Add to the cost of the walkable positions of entities that block movement.
+
+        `cost` covers the tiles from x_lower, y_lower onward, entities outside of it are skipped.
+        """
+        # A lower number means more enemies will crowd behind each other in
+        # hallways.  A higher number means enemies will take longer paths in
+        # order to surround the player.
+        table = self.entity_table
+        x = table.x[table.blocks_movement] - x_lower
+        y = table.y[table.blocks_movement] - y_lower
+        inside = (0 <= x) & (x < cost.shape[0]) & (0 <= y) & (y < cost.shape[1])
+        x, y = x[inside], y[inside]
+        walkable = cost[x, y] != 0
+        np.add.at(cost, (x[walkable], y[walkable]), 10)  # add.at, as several entities may block the same tile
+
+    def get_pathfinder_to(self, x: int, y: int) -> tcod.path.Pathfinder:
+        """Return a pathfinder rooted at the given location.
+
+        Paths from any tile toward the root are read with `path_from`, which walks downhill on the distance map.
+        """
+        graph = tcod.path.SimpleGraph(cost=self.get_pathing_cost(), cardinal=2, diagonal=3)
+        pathfinder = tcod.path.Pathfinder(graph)
+        pathfinder.add_root((x, y))
+        return pathfinder
+
+    def unload_far_chunks(self, x: int, y: int) -> None:
+        """Free the memory of the parts of the map far from x, y.  A dense map keeps all of it in memory."""
+        pass
+
     def in_bounds(self, x: int, y: int) -> bool:
         """Return True if x and y are inside of the bounds of this map."""
         return 0 <= x < self.width and 0 <= y < self.height
@@ -98,24 +373,125 @@ class GameMap:
         """
         console.tiles_rgb[0 : self.width, 0 : self.height] = np.select(
             condlist=[self.visible, self.explored],
-            choicelist=[self.tiles["light"], self.tiles["dark"]],
+            choicelist=[tile_types.TILES["light"][self.tile_ids], tile_types.TILES["dark"][self.tile_ids]],
             default=tile_types.SHROUD,
         )
 
-        entities_sorted_for_rendering = sorted(
-            self.entities, key=lambda x: x.render_order.value
-        )
+        table = self.entity_table
+        rows = np.flatnonzero(table.on_tiles(self.visible))
+        for row in rows[np.argsort(table.render_order[rows], kind="stable")]:
+            entity = table.entities[row]
+            console.print(
+                x=entity.x, y=entity.y, string=entity.char, fg=entity.color
+            )
+
+
+class WindowedPathfinder:
+    """A pathfinder over a window of a map's cost, taking and returning map coordinates.
+
+    Paths from or to tiles outside of the window are empty.
+    """
+
+    def __init__(self, cost: np.ndarray, x_lower: int, y_lower: int):
+        self.origin = np.array((x_lower, y_lower))
+        self.shape = cost.shape
+        self.pathfinder = tcod.path.Pathfinder(tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3))
+
+    def _in_window(self, index: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        x, y = index[0] - self.origin[0], index[1] - self.origin[1]
+        if 0 <= x < self.shape[0] and 0 <= y < self.shape[1]:
+            return x, y
+        return None
+
+    def add_root(self, index: Tuple[int, int]) -> None:
+        self.pathfinder.add_root(self._in_window(index))
+
+    def path_from(self, index: Tuple[int, int]) -> np.ndarray:
+        local = self._in_window(index)
+        if local is None:
+            return np.array([index])
+        return self.pathfinder.path_from(local) + self.origin
 
-        for entity in entities_sorted_for_rendering:
-            if self.visible[entity.x, entity.y]:
-                console.print(
-                    x=entity.x, y=entity.y, string=entity.char, fg=entity.color
-                )
+    def path_to(self, index: Tuple[int, int]) -> np.ndarray:
+        local = self._in_window(index)
+        if local is None:
+            return np.array([index])
+        return self.pathfinder.path_to(local) + self.origin
+
+
+class ChunkedGameMap(GameMap):
+    """
+    A GameMap whose per tile arrays are ChunkedArrays, for worlds too large to be stored densely.
+
+    Memory scales with the area that was dug out or explored instead of with the size of the world, and the chunks far
+    from the player are spilled to disk by unload_far_chunks.  There is no cost array for the whole map, pathfinders
+    only cover the tiles within PATHING_RADIUS of their root.
+    """
+
+    def __init__(self, engine: Engine, width: int, height: int, entities: Iterable[Entity] = ()):
+        super().__init__(engine, width, height, entities)
+        self.loaded_center: Optional[Tuple[int, int]] = None  # Chunk unload_far_chunks last kept the map around
+
+    def new_array(self, dtype: Any, fill_value: Any) -> ChunkedArray:
+        return ChunkedArray((self.width, self.height), dtype, fill_value)
+
+    def lookup_tiles(self, table: np.ndarray) -> ChunkedArray:
+        return self.tile_ids.lookup(table)
+
+    @property
+    def chunked_arrays(self) -> List[ChunkedArray]:
+        return [self.tile_ids, self.walkable, self.transparent, self.walkable_bitmasking, self.visible, self.explored]
+
+    def generate_bitmasking(self) -> None:
+        # Only the dug out chunks, and the tiles bordering them, differ from the default wall mask.
+        for key in self.tile_ids.chunk_keys():
+            x_window, y_window = self.tile_ids.chunk_bounds(key)
+            self.refresh_bitmasking_area(x_window.start - 1, x_window.stop + 1, y_window.start - 1, y_window.stop + 1)
+
+    def get_pathing_cost(
+        self, x_lower: int = 0, y_lower: int = 0, x_upper: Optional[int] = None, y_upper: Optional[int] = None,
+    ) -> np.ndarray:
+        # No cost array is kept for the whole map, the window's cost is read from walkable.
+        cost = np.asfortranarray(self.walkable[x_lower:x_upper, y_lower:y_upper], dtype=np.int8)
+        self.add_blocking_costs(cost, x_lower, y_lower)
+        return cost
+
+    def get_pathfinder_to(self, x: int, y: int) -> WindowedPathfinder:
+        x_lower, y_lower = max(x - PATHING_RADIUS, 0), max(y - PATHING_RADIUS, 0)
+        x_upper, y_upper = min(x + PATHING_RADIUS + 1, self.width), min(y + PATHING_RADIUS + 1, self.height)
+        cost = self.get_pathing_cost(x_lower, y_lower, x_upper, y_upper)
+        pathfinder = WindowedPathfinder(cost, x_lower, y_lower)
+        pathfinder.add_root((x, y))
+        return pathfinder
+
+    def unload_far_chunks(self, x: int, y: int) -> None:
+        """Spill the chunks further than UNLOAD_CHUNK_RADIUS chunks from x, y to disk."""
+        center_x, center_y = x // CHUNK_SIZE, y // CHUNK_SIZE
+        if self.loaded_center == (center_x, center_y):
+            return  # Nothing went out of range since the last call.
+        self.loaded_center = center_x, center_y
+
+        for array in self.chunked_arrays:
+            for chunk_x, chunk_y in list(array.chunks):
+                if max(abs(chunk_x - center_x), abs(chunk_y - center_y)) > UNLOAD_CHUNK_RADIUS:
+                    array.spill((chunk_x, chunk_y))
+
+
+def new_game_map(engine: Engine, width: int, height: int) -> GameMap:
+    """Return an empty map, stored in chunks if it is larger than CHUNKED_MAP_AREA."""
+    if width * height > CHUNKED_MAP_AREA:
+        return ChunkedGameMap(engine, width, height)
+    return GameMap(engine, width, height)
 
 
 class GameWorld:
     """
-    Holds the settings for the GameMap, and generates new maps when moving down the stairs.
+    Holds the settings for the GameMap, generates new maps when moving down the stairs, and keeps the floors already
+    visited so the player can go back to them.
+
+    The most recently visited floors stay live, up to max_live_floors and live_budget bytes of map arrays.  Older
+    floors are kept as compressed snapshots, and the least recently visited snapshots are dropped once they take more
+    than snapshot_budget bytes.  A dropped floor is generated anew when the player goes back to it.
     """
 
     def __init__(
@@ -127,7 +503,11 @@ class GameWorld:
         max_rooms: int,
         room_min_size: int,
         room_max_size: int,
-        current_floor: int = 0
+        current_floor: int = 0,
+        seed: Optional[int] = None,
+        max_live_floors: int = MAX_LIVE_FLOORS,
+        live_budget: int = LIVE_FLOOR_BUDGET,
+        snapshot_budget: int = SNAPSHOT_BUDGET,
     ):
         self.engine = engine
 
@@ -140,17 +520,119 @@ class GameWorld:
         self.room_max_size = room_max_size
 
         self.current_floor = current_floor
+        # Seed the floors are generated from, the session's unless given
+        self.seed = globals.SEED_NUMBER if seed is None else seed
+
+        self.max_live_floors = max_live_floors
+        self.live_budget = live_budget
+        self.snapshot_budget = snapshot_budget
+        # Visited floors by floor number, least recently visited first
+        self.live_floors: OrderedDict[int, GameMap] = OrderedDict()
+        self.floor_snapshots: OrderedDict[int, bytes] = OrderedDict()
+        # The floor being generated in the background, and its result
+        self.pregenerated_floor: Optional[int] = None
+        self.pregenerated_map: Optional[Future] = None
+
+    def __getstate__(self) -> dict:
+        # A floor still being generated is not saved, it is generated again when needed.
+        state = self.__dict__.copy()
+        state["pregenerated_floor"] = None
+        state["pregenerated_map"] = None
+        return state
 
     def generate_floor(self) -> None:
-        from procgen import generate_dungeon
-
+        """Move the player into the first room of a new floor below the current one."""
         self.current_floor += 1
 
-        self.engine.game_map = generate_dungeon(
+        game_map = self.take_pregenerated_floor(self.current_floor) or self.build_floor(self.current_floor)
+        self.enter_floor(self.current_floor, game_map, game_map.start_location)
+
+    def build_floor(self, floor: int) -> GameMap:
+        """Generate a floor.  The same floor of the same seed is always generated the same way."""
+        from procgen import generate_dungeon
+
+        return generate_dungeon(
             max_rooms=self.max_rooms,
             room_min_size=self.room_min_size,
             room_max_size=self.room_max_size,
             map_width=self.map_width,
             map_height=self.map_height,
             engine=self.engine,
+            floor_number=floor,
+            rng=floor_stream(self.seed, "procgen", floor),
+            spawn_rng=floor_stream(self.seed, "spawning", floor),
         )
+
+    def pregenerate_floor(self, floor: int) -> None:
+        """Start generating a floor in the background, unless it was already visited or is being generated."""
+        if floor == self.pregenerated_floor or floor in self.live_floors or floor in self.floor_snapshots:
+            return
+
+        if self.pregenerated_map:
+            self.pregenerated_map.cancel()
+        self.pregenerated_floor = floor
+        self.pregenerated_map = floor_generator.submit(self.build_floor, floor)
+
+    def take_pregenerated_floor(self, floor: int) -> Optional[GameMap]:
+        """Return the floor generated in the background, waiting for it if needed, or None if it was not started."""
+        if floor != self.pregenerated_floor:
+            return None
+
+        game_map = self.pregenerated_map.result()
+        self.pregenerated_floor = None
+        self.pregenerated_map = None
+        return game_map
+
+    def descend(self) -> None:
+        """Move the player down to the up stairs of the next floor, generating the floor if it was never visited."""
+        game_map = self.fetch_floor(self.current_floor + 1)
+        if game_map:
+            self.enter_floor(self.current_floor + 1, game_map, game_map.upstairs_location)
+        else:
+            self.generate_floor()
+
+    def ascend(self) -> None:
+        """Move the player up to the down stairs of the previous floor."""
+        game_map = self.fetch_floor(self.current_floor - 1)
+        if game_map:
+            self.enter_floor(self.current_floor - 1, game_map, game_map.downstairs_location)
+        else:  # The floor was dropped from the store, it is generated again the same way.
+            game_map = self.build_floor(self.current_floor - 1)
+            self.enter_floor(self.current_floor - 1, game_map, game_map.downstairs_location)
+
+    def enter_floor(self, floor: int, game_map: GameMap, location: Tuple[int, int]) -> None:
+        self.current_floor = floor
+        self.engine.game_map = game_map
+        self.engine.player.place(*location, game_map)
+        self.store_floor(floor, game_map)
+        self.pregenerate_floor(floor + 1)
+
+    def fetch_floor(self, floor: int) -> Optional[GameMap]:
+        """Return a visited floor, restoring it from its snapshot if needed, or None if it is not in the store."""
+        if floor in self.live_floors:
+            game_map = self.live_floors[floor]
+        elif floor in self.floor_snapshots:
+            game_map = pickle.loads(zlib.decompress(self.floor_snapshots.pop(floor)))
+        else:
+            return None
+
+        game_map.engine = self.engine
+        return game_map
+
+    def store_floor(self, floor: int, game_map: GameMap) -> None:
+        """Keep a floor live as the most recently visited one, then evict floors over the budgets."""
+        self.live_floors[floor] = game_map
+        self.live_floors.move_to_end(floor)
+
+        live_bytes = sum(live_map.nbytes for live_map in self.live_floors.values())
+        while len(self.live_floors) > 1 and (
+            len(self.live_floors) > self.max_live_floors or live_bytes > self.live_budget
+        ):
+            old_floor, old_map = self.live_floors.popitem(last=False)
+            live_bytes -= old_map.nbytes
+            self.floor_snapshots[old_floor] = zlib.compress(pickle.dumps(old_map, protocol=pickle.HIGHEST_PROTOCOL))
+
+        snapshot_bytes = sum(len(snapshot) for snapshot in self.floor_snapshots.values())
+        while snapshot_bytes > self.snapshot_budget:
+            _, snapshot = self.floor_snapshots.popitem(last=False)
+            snapshot_bytes -= len(snapshot)
@@ -1,25 +1,107 @@
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from kivy.graphics import Color, Quad, PushMatrix, PopMatrix, Rectangle, Rotate, Translate
+from kivy.graphics import Color, InstructionGroup, Quad, PushMatrix, PopMatrix, Rotate, Translate
 from kivy.graphics.texture import Texture
 from kivy.properties import BoundedNumericProperty
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.widget import Widget
+import numpy as np
 
 from entity import Direction
 from bitmasking.WallCharNames import WALL_CHARS
+from gui.map_layer import MapLayer
+from render_order import RenderOrder
+
+
+# Every texture a map tile can show, and the index of the wall texture for each bitmasking number
+TILE_TEXTURE_NAMES = ["blank", "floor", "stairs"] + sorted(set(WALL_CHARS.values()) - {"blank", "floor"})
+BLANK_INDEX, FLOOR_INDEX, STAIRS_INDEX = 0, 1, 2
+WALL_TEXTURE_INDEXES = np.zeros(max(WALL_CHARS) + 1, dtype=np.int8)
+for _bitmasking_number, _tile_name in WALL_CHARS.items():
+    WALL_TEXTURE_INDEXES[_bitmasking_number] = TILE_TEXTURE_NAMES.index(_tile_name)
+
+LIT_HUE = 1.0, 1.0, 1.0, 1.0
+UNLIT_HUE = 0.25, 0.25, 0.25, 1.0
+
+
+class EntitySprite:
+    """
+    Reusable canvas instructions that draw one entity: PushMatrix, Translate, Color, Quad, PopMatrix.
+    """
+
+    def __init__(self):
+        self.group = InstructionGroup()
+        self.translate = Translate()
+        self.color = Color(1, 1, 1, 1)
+        self.quad = Quad()
+        self.texture: Optional[Texture] = None
+        self.facing_left: Optional[bool] = None
+
+        self.group.add(PushMatrix())
+        self.group.add(self.translate)
+        self.group.add(self.color)
+        self.group.add(self.quad)
+        self.group.add(PopMatrix())
+
+    def update(self, tex: Texture, rgb: Tuple[int, int, int], x: float, y: float, facing_left: bool) -> None:
+        # Only touch the instructions that changed, every assignment marks the canvas for a redraw
+        if tex is not self.texture or facing_left != self.facing_left:
+            half_width, half_height = tex.size[0] * 0.5, tex.size[1] * 0.5
+            # Direction of Sprite
+            if facing_left:
+                self.quad.points = (-half_width, -half_height, half_width, -half_height,
+                                    half_width, half_height, -half_width, half_height)
+            else:  # Direction.RIGHT
+                self.quad.points = (half_width, -half_height, -half_width, -half_height,
+                                    -half_width, half_height, half_width, half_height)
+            self.quad.texture = tex
+            self.texture = tex
+            self.facing_left = facing_left
+        if self.color.rgb != list(rgb):
+            self.color.rgb = rgb
+        if self.translate.xy != (x, y):
+            self.translate.xy = x, y
+
+
+class EntityLayer:
+    """
+    Pool of EntitySprites for a single RenderOrder.
+
+    Sprites are never freed, unused ones are only detached from the layer's InstructionGroup so they stop drawing.
+    """
+
+    def __init__(self):
+        self.group = InstructionGroup()
+        self.sprites: List[EntitySprite] = []
+        self.active_count = 0
+
+    def acquire(self, count: int) -> List[EntitySprite]:
+        """Attach exactly `count` sprites to the layer and return them."""
+        while len(self.sprites) < count:
+            self.sprites.append(EntitySprite())
+        for sprite in self.sprites[self.active_count:count]:
+            self.group.add(sprite.group)
+        for sprite in self.sprites[count:self.active_count]:
+            self.group.remove(sprite.group)
+        self.active_count = count
+        return self.sprites[:count]
 
 
 class GameWindow(FloatLayout):
-    rect_dict: Dict[Tuple[int, int], Rectangle] = {}  # dictionary of all coordinates mapped to tiles
+    map_layer: Optional[MapLayer] = None  # every tile of the viewport, drawn as a few Meshes
     quad_dict: Dict[Tuple[int, int], Quad] = {}  # dictionary of all coordinates mapped to tile quads
-    hue_dict: Dict[Tuple[int, int], Color] = {}  # dictionary of all coordinates mapped to tile hues
 
     # tiles: Dict[str, Dict[str, Optional[Color, Quad, Rotate, Translate]]] = {}
     rotate_dict: Dict[Tuple[int, int], Rotate] = {}
     translate_dict: Dict[Tuple[int, int], Translate] = {}
 
     entity_graphics: List[Quad] = []
+    entity_layers: Dict[RenderOrder, EntityLayer] = {}  # pooled entity sprites for each render layer
+
+    # Last texture index and lighting assigned to each viewport slot, so only changed slots are touched
+    slot_textures: Optional[np.ndarray] = None
+    slot_lit: Optional[np.ndarray] = None
+    slot_origin: Optional[Tuple[float, float]] = None
 
     tile_tex_dict: Dict[str, Texture] = {}  # dictionary of all tile names and their palettes
     TILE_SIZE = 32
@@ -35,28 +117,27 @@ class GameWindow(FloatLayout):
         self.size = self.TILE_SIZE * self.VIEWPORT_WINDOW * 2, self.TILE_SIZE * self.VIEWPORT_WINDOW * 2
         self.pos_hint = {"x": 0, "top": 1}
         self.initialize_tiles()
+        self.initialize_entity_layers()
 
     def on_animation_cycle_index(self, instance, value):
         # print(f"on_animation_cycle_index:{value}")
         pass
 
     def reset_tiles(self) -> None:
-        self.hue_dict = {}
-        self.rect_dict = {}
+        if self.map_layer:
+            self.canvas.remove(self.map_layer.render_context)
+        self.map_layer = None
         self.rotate_dict = {}
         self.translate_dict = {}
         self.quad_dict = {}
+        self.slot_textures = None
+        self.slot_lit = None
+        self.slot_origin = None
 
     def initialize_tiles(self) -> None:
         self.reset_tiles()
-        with self.canvas:
-            for i in range(self.VIEWPORT_WINDOW * 2):
-                for j in range(self.VIEWPORT_WINDOW * 2):
-                    self.hue_dict[(i, j)] = Color(1, 1, 1, 1)
-                    self.rect_dict[(i, j)] = \
-                        Rectangle(size=(self.TILE_SIZE, self.TILE_SIZE),
-                                  pos=(self.x + (i * self.TILE_SIZE), self.y + (j * self.TILE_SIZE))
-                                  )
+        self.map_layer = MapLayer(self.VIEWPORT_WINDOW * 2, self.VIEWPORT_WINDOW * 2, self.TILE_SIZE)
+        self.canvas.add(self.map_layer.render_context)
 
     def obtain_viewport_dimensions(self, origin_x: int, origin_y: int) -> Tuple[int, int, int, int]:
         """
@@ -91,100 +172,83 @@ class GameWindow(FloatLayout):
         else:  # center ON PLAYER
             x_lower, x_upper, y_lower, y_upper = self.obtain_viewport_dimensions(player.x, player.y)
 
-        with self.canvas:
-            # Render BG tiles
-            self.render_tiles(view_mode, x_lower, x_upper, y_lower, y_upper, dt)
-
-            # Render Map Object : Down Stairs
-            self.render_map_objects(view_mode, x_lower, x_upper, y_lower, y_upper, dt)
+        # Render BG tiles
+        self.render_tiles(view_mode, x_lower, x_upper, y_lower, y_upper, dt)
 
-        self.canvas.after.clear()
-        with self.canvas.after:
-            # Render Entities
-            self.render_entities(view_mode, x_lower, x_upper, y_lower, y_upper, dt)
+        # Render Entities
+        self.render_entities(view_mode, x_lower, x_upper, y_lower, y_upper, dt)
 
     def render_tiles(self, view_mode: int, x_lower: int, x_upper: int, y_lower: int, y_upper: int, dt: float) -> None:
-        for x in range(x_lower, x_upper, 1):
-            for y in range(y_lower, y_upper, 1):
-                tex = self.parent.tile_tex_dict["blank"]
-                hue_tuple = 0.25, 0.25, 0.25, 1.0
-                try:
-                    z = 1 / (x + abs(x))
-                    z = 1 / (y + abs(y))
-
-                    # No Fog of War
-                    if view_mode == 1:
-                        hue_tuple = 1.0, 1.0, 1.0, 1.0
-                        if self.engine.game_map.tiles[x][y]["walkable"]:
-                            tex = self.parent.tile_tex_dict["floor"]
-                        else:
-                            bitmasking_number = self.engine.game_map.walkable_bitmasking[x][y]
-                            tile_name = WALL_CHARS[bitmasking_number]
-
-                            tex = self.parent.tile_tex_dict[tile_name]
-                    elif view_mode == 0: # normal view
-
-
-
-                        if self.engine.game_map.visible[x][y]:
-                            hue_tuple = 1.0, 1.0, 1.0, 1.0
-                            if self.engine.game_map.tiles[x][y]["walkable"]:
-                                tex = self.parent.tile_tex_dict["floor"]
-                            else:
-                                bitmasking_number = self.engine.game_map.walkable_bitmasking[x][y]
-                                tile_name = WALL_CHARS[bitmasking_number]
-
-                                # print(bitmasking_number, tile_name)
-                                tex = self.parent.tile_tex_dict[tile_name]
-                                # tex = self.parent.tile_tex_dict["wall"]
-
-                        elif self.engine.game_map.explored[x][y]:
-                            # hue = 0.2, 0.2, 0.2, 1.0
-                            if self.engine.game_map.tiles[x][y]["walkable"]:
-                                tex = self.parent.tile_tex_dict["floor"]
-                            else:
-                                bitmasking_number = self.engine.game_map.walkable_bitmasking[x][y]
-                                tile_name = WALL_CHARS[bitmasking_number]
-                                # print(bitmasking_number, tile_name)
-                                tex = self.parent.tile_tex_dict[tile_name]
-                                # tex = self.parent.tile_tex_dict["wall"]
-
-                except ZeroDivisionError:
-                    """
-                    Ensure that accessing the 2D matrix using negative numbers doesn't access the other end of 
-                    2D matrix
-                    """
-                    pass
-                except IndexError:
-                    pass
-
-                x_norm = x - x_lower
-                y_norm = y - y_lower
-
-                tile = self.rect_dict.get((x_norm, y_norm))
-                tile.texture = tex
-                tile.pos = self.x + (x_norm * self.TILE_SIZE), self.y + (y_norm * self.TILE_SIZE)
-
-                tile_hue = self.hue_dict.get((x_norm, y_norm))
-                tile_hue.rgba = hue_tuple
-
-    def render_map_objects(self, view_mode: int, x_lower: int, x_upper: int, y_lower: int, y_upper: int,
-                           dt: float) -> None:
+        game_map = self.engine.game_map
+
+        # Viewport windows of the map arrays. Column and row 0 and anything outside the map stay blank.
+        window_size = x_upper - x_lower, y_upper - y_lower
+        walkable = np.zeros(window_size, dtype=bool)
+        bitmasking = np.zeros(window_size, dtype=np.int16)
+        visible = np.zeros(window_size, dtype=bool)
+        explored = np.zeros(window_size, dtype=bool)
+        in_map = np.zeros(window_size, dtype=bool)
+
+        map_x_lower, map_x_upper = max(x_lower, 1), min(x_upper, game_map.width)
+        map_y_lower, map_y_upper = max(y_lower, 1), min(y_upper, game_map.height)
+        if map_x_lower < map_x_upper and map_y_lower < map_y_upper:
+            map_window = slice(map_x_lower, map_x_upper), slice(map_y_lower, map_y_upper)
+            viewport_window = (slice(map_x_lower - x_lower, map_x_upper - x_lower),
+                               slice(map_y_lower - y_lower, map_y_upper - y_lower))
+            walkable[viewport_window] = game_map.walkable[map_window]
+            bitmasking[viewport_window] = game_map.walkable_bitmasking[map_window]
+            visible[viewport_window] = game_map.visible[map_window]
+            explored[viewport_window] = game_map.explored[map_window]
+            in_map[viewport_window] = True
+
+        if view_mode == 1:  # No Fog of War
+            shown = in_map
+            # Every slot past column and row 0 is lit, including the blank ones beyond the far edges of the map
+            lit = np.zeros(window_size, dtype=bool)
+            lit[max(1 - x_lower, 0):, max(1 - y_lower, 0):] = True
+        else:  # normal view
+            shown = in_map & (visible | explored)
+            lit = in_map & visible
+
+        tile_textures = np.where(walkable, FLOOR_INDEX, WALL_TEXTURE_INDEXES[bitmasking])
+        textures = np.where(shown, tile_textures, BLANK_INDEX).astype(np.int8)
+
+        # Render Map Object : Down Stairs
+        self.render_map_objects(textures, x_lower, x_upper, y_lower, y_upper)
+
+        # Only rewrite the vertices of slots whose texture or hue changed since the last frame
+        if self.slot_textures is None or self.slot_textures.shape != textures.shape:
+            self.map_layer.set_atlas(self.parent.atlas, self.parent.atlas_uv_dict)
+            changed = np.ones(textures.shape, dtype=bool)
+        else:
+            changed = (textures != self.slot_textures) | (lit != self.slot_lit)
+        self.slot_textures = textures
+        self.slot_lit = lit
+
+        changed_slots = list(zip(*np.nonzero(changed)))
+        self.map_layer.set_slots(changed_slots,
+                                 [TILE_TEXTURE_NAMES[textures[key]] for key in changed_slots],
+                                 [LIT_HUE if lit[key] else UNLIT_HUE for key in changed_slots])
+
+        # Slots only move when the widget itself moves
+        if self.slot_origin != (self.x, self.y):
+            self.slot_origin = self.x, self.y
+            self.map_layer.set_origin(self.x, self.y)
+
+        self.map_layer.flush()
+
+    def render_map_objects(self, textures: np.ndarray, x_lower: int, x_upper: int, y_lower: int,
+                           y_upper: int) -> None:
         # Render All Map Objects into Viewport
         # All Objects that are to be rendered ON-TOP of the background tiles
         # For example, stairs, furniture, doodads
-        Color(1.0, 1.0, 1.0, 1)
-        stair_x, stair_y = self.engine.game_map.downstairs_location
-        if self.engine.game_map.visible[stair_x][stair_y] or self.engine.game_map.explored[stair_x][stair_y]:
-            x_norm = stair_x - x_lower
-            y_norm = stair_y - y_lower
-            tile = self.rect_dict.get((x_norm, y_norm))
-            try:
-                tile.texture = self.parent.tile_tex_dict["stairs"]
-                tile.pos = self.x + (x_norm * self.TILE_SIZE), self.y + (y_norm * self.TILE_SIZE)
-            except AttributeError:
-                pass
-                # print("cannot find tile stair tile :(", tile, stair_x, stair_y)
+        for stairs_location in (self.engine.game_map.downstairs_location, self.engine.game_map.upstairs_location):
+            if stairs_location is None:
+                continue
+            stair_x, stair_y = stairs_location
+            if self.engine.game_map.visible[stair_x, stair_y] or self.engine.game_map.explored[stair_x, stair_y]:
+                if x_lower <= stair_x < x_upper and y_lower <= stair_y < y_upper:
+                    textures[stair_x - x_lower, stair_y - y_lower] = STAIRS_INDEX
 
     def remove_entity_graphics(self, dt):
         for entity_graphic in self.entity_graphics:
@@ -192,6 +256,14 @@ class GameWindow(FloatLayout):
 
         self.entity_graphics = []
 
+    def initialize_entity_layers(self) -> None:
+        # One layer per RenderOrder, added in drawing order so no per frame sort is needed
+        self.canvas.after.clear()
+        self.entity_layers = {}
+        for render_order in RenderOrder:
+            self.entity_layers[render_order] = EntityLayer()
+            self.canvas.after.add(self.entity_layers[render_order].group)
+
     def render_entities(self,
                         view_mode: int,
                         x_lower: int,
@@ -200,73 +272,44 @@ class GameWindow(FloatLayout):
                         y_upper: int,
                         dt: float) -> None:
 
-        # Temporary, Should be Converted to self.quad_dict instead of List
-        # self.remove_entity_graphics(dt)
-        # print("entities : ", len(self.engine.game_map.entities))
-
+        table = self.engine.game_map.entity_table
         if view_mode == 1:  # render all entities within viewport
-            entities_sorted_for_rendering = [e for e in self.engine.game_map.entities if
-                                             x_lower <= e.x < x_upper and
-                                             y_lower <= e.y < y_upper]
+            in_view = table.in_rect(x_lower, x_upper, y_lower, y_upper)
         else:  # render all entities within FOV
-            entities_sorted_for_rendering = [e for e in self.engine.game_map.entities
-                                             if self.engine.game_map.visible[e.x][e.y]]
-        entities_sorted_for_rendering = sorted(
-            entities_sorted_for_rendering, key=lambda entity: entity.render_order.value
-        )
-        # print("entity count: ", len(self.engine.game_map.entities))
-
-        # Update Each Entity Within "View"
-        for e in entities_sorted_for_rendering:
-            x_norm = e.x - x_lower
-            y_norm = e.y - y_lower
-
-            # Update Animation Cycle
-            texture_name = e.name2
-            try:
-                # Find Max Cycle Count
-                max_anim_cycle = self.parent.tex_count_dict[texture_name]
-
-                # Use Modulus to Find out Which Anim Cycle to be On
-                true_anim_index = ( int(self.animation_cycle_index) % max_anim_cycle ) * e.is_alive
-                # print(f"true_anim_index: {true_anim_index}")
-                # Trickery to allow for player.png and player_0.png to exist as the same file
-                # print(f"{texture_name}" + "%s" % (("_%s" % true_anim_index) * true_anim_index))
-                tex = self.parent.tile_tex_dict[f"{texture_name}" + "%s" % (("-%s" % true_anim_index) * true_anim_index)]
-            except KeyError:
-                # Revert to First Texture
-                e.animation_index = 0
-                tex = self.parent.tile_tex_dict[f"{texture_name}"]
-                # print(f"KeyError with {e.name} animation_index:{e.animation_index} texture_name:{texture_name}")
-            texture_size = tex.size * 2
-
-
-            try:
-                # Rendering
-                PushMatrix()
-                entity_translate = Translate()
-                entity_color = Color()
-                entity_color.rgb = e.color
-                entity_color.a = 1
-
-                # Direction of Sprite
-                if e.direction == Direction.LEFT:
-                    entity_quad = Quad(texture=tex,
-                                       points=(-texture_size[0] * 0.5, -texture_size[1] * 0.5,
-                                               texture_size[0] * 0.5, -texture_size[1] * 0.5,
-                                               texture_size[0] * 0.5, texture_size[1] * 0.5,
-                                               -texture_size[0] * 0.5, texture_size[1] * 0.5)
-                                       )
-                else:  # elif e.direction == Direction.RIGHT:
-                    entity_quad = Quad(texture=tex,
-                                       points=(texture_size[0] * 0.5, -texture_size[1] * 0.5,
-                                               -texture_size[0] * 0.5, -texture_size[1] * 0.5,
-                                               -texture_size[0] * 0.5, texture_size[1] * 0.5,
-                                               texture_size[0] * 0.5, texture_size[1] * 0.5)
-                                       )
-                entity_translate.xy = self.x + (texture_size[0] * 0.5) + (x_norm * self.TILE_SIZE), \
-                                      self.y + (texture_size[1] * 0.5) + (y_norm * self.TILE_SIZE)
-                # self.entity_graphics.append(entity_quad)
-                PopMatrix()
-            except KeyError:
-                print(f"Couldn't render Entity:{e.name}|{e.name2} at (map x,map y):({e.x},{e.y})")
\ No newline at end of file
+            in_view = table.on_tiles(self.engine.game_map.visible)
+
+        # Bucket entities into their render layer
+        layer_buckets = {
+            render_order: table.select(in_view & (table.render_order == render_order.value))
+            for render_order in self.entity_layers
+        }
+
+        for render_order, entities in layer_buckets.items():
+            layer = self.entity_layers[render_order]
+            for sprite, e in zip(layer.acquire(len(entities)), entities):
+                x_norm = e.x - x_lower
+                y_norm = e.y - y_lower
+
+                # Update Animation Cycle
+                texture_name = e.name2
+                try:
+                    # Find Max Cycle Count
+                    max_anim_cycle = self.parent.tex_count_dict[texture_name]
+
+                    # Use Modulus to Find out Which Anim Cycle to be On
+                    true_anim_index = ( int(self.animation_cycle_index) % max_anim_cycle ) * e.is_alive
+                    # Trickery to allow for player.png and player_0.png to exist as the same file
+                    tex = self.parent.tile_tex_dict[f"{texture_name}" + "%s" % (("-%s" % true_anim_index) * true_anim_index)]
+                except KeyError:
+                    # Revert to First Texture
+                    e.animation_index = 0
+                    tex = self.parent.tile_tex_dict[f"{texture_name}"]
+                    # print(f"KeyError with {e.name} animation_index:{e.animation_index} texture_name:{texture_name}")
+                texture_size = tex.size
+
+                sprite.update(tex,
+                              e.color,
+                              self.x + (texture_size[0] * 0.5) + (x_norm * self.TILE_SIZE),
+                              self.y + (texture_size[1] * 0.5) + (y_norm * self.TILE_SIZE),
+                              e.direction == Direction.LEFT)
+
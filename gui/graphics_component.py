@@ -33,6 +33,8 @@ class GraphicsFrame(FloatLayout):
         self.tile_tex_dict: Dict[str, Texture] = graphics_loader.populate_palette()
         self.tile_tex_dict.update(graphics_loader.assemble_textures())
         self.tex_count_dict: Dict[str, int] = graphics_loader.count_textures()
+        # Every texture above packed into one, so the map layer is drawn with a single texture bind
+        self.atlas, self.atlas_uv_dict = graphics_loader.build_atlas(self.tile_tex_dict)
         # for key, value in self.tex_count_dict.items():
         #     print(key, value)
 
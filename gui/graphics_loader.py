@@ -12,6 +12,9 @@ from typing import Dict, Tuple
 
 from kivy.graphics.texture import Texture
 
+# Texture coordinates of an atlas region, in the same 8 float order as Texture.tex_coords
+UVRect = Tuple[float, float, float, float, float, float, float, float]
+
 
 def populate_palette() -> Dict[str, Texture]:
     colors = {"floor": [200, 100, 50],
@@ -96,4 +99,48 @@ def generate_simple_texture(rgb_palette: Tuple[int, int, int]) -> Texture:
     buf = c * size
     arr = array("B", buf)
     t.blit_buffer(arr, colorfmt="rgba", bufferfmt="ubyte")
-    return t
\ No newline at end of file
+    return t
+
+
+def build_atlas(tile_tex_dict: Dict[str, Texture], width: int = 512, padding: int = 2) -> Tuple[Texture, Dict[str, UVRect]]:
+    """
+    Pack every texture into one atlas texture
+
+    Textures are placed in rows (tallest first), each surrounded by `padding` transparent pixels so filtering never
+    bleeds into a neighbour.
+
+    :return: atlas, uv_dict - the atlas texture and the texture coordinates of every name in `tile_tex_dict`
+    """
+    names = sorted(tile_tex_dict, key=lambda name: (-tile_tex_dict[name].height, name))
+
+    # Shelf packing
+    positions = {}
+    x = y = shelf_height = 0
+    for name in names:
+        tex_width, tex_height = tile_tex_dict[name].size
+        if x + tex_width + padding * 2 > width:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        positions[name] = x + padding, y + padding
+        x += tex_width + padding * 2
+        shelf_height = max(shelf_height, tex_height + padding * 2)
+    height = y + shelf_height
+
+    atlas = Texture.create(size=(width, height), colorfmt="rgba")
+    atlas.mag_filter = "nearest"
+    atlas.min_filter = "nearest"
+    atlas.blit_buffer(bytes(width * height * 4), colorfmt="rgba", bufferfmt="ubyte")
+
+    uv_dict = {}
+    for name, (x, y) in positions.items():
+        tex = tile_tex_dict[name]
+        atlas.blit_buffer(tex.pixels, pos=(x, y), size=tex.size, colorfmt="rgba", bufferfmt="ubyte")
+
+        # Keep the orientation of the source texture (images loaded from file are flipped vertically)
+        u0, v0, u1, _, _, v1, _, _ = atlas.get_region(x, y, *tex.size).tex_coords
+        if tex.tex_coords[1] > tex.tex_coords[5]:
+            v0, v1 = v1, v0
+        uv_dict[name] = u0, v0, u1, v0, u1, v1, u0, v1
+
+    return atlas, uv_dict
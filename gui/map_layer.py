@@ -0,0 +1,107 @@
+"""
+map_layer.py
+Draws every tile of the viewport as Meshes textured from the tile atlas, so the whole map layer takes a few draw calls.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+from kivy.graphics import Mesh, RenderContext
+from kivy.graphics.texture import Texture
+import numpy as np
+
+from gui.graphics_loader import UVRect
+
+# Same as the default Kivy shader, with the colour taken from each vertex instead of the current Color
+VERTEX_SHADER = """
+$HEADER$
+attribute vec4 vColor;
+
+void main(void) {
+    frag_color = vColor * color * vec4(1.0, 1.0, 1.0, opacity);
+    tex_coord0 = vTexCoords0;
+    gl_Position = projection_mat * modelview_mat * vec4(vPosition.xy, 0.0, 1.0);
+}
+"""
+
+FRAGMENT_SHADER = """
+$HEADER$
+
+void main(void) {
+    gl_FragColor = frag_color * texture2D(texture0, tex_coord0);
+}
+"""
+
+VERTEX_FORMAT = [(b"vPosition", 2, "float"), (b"vTexCoords0", 2, "float"), (b"vColor", 4, "float")]
+VERTEX_SIZE = 8  # floats per vertex: x, y, u, v, r, g, b, a
+
+# Corners of a tile quad, counter clockwise from the bottom left, and the two triangles drawn from them
+QUAD_CORNERS = np.array([(0, 0), (1, 0), (1, 1), (0, 1)], dtype=np.float32)
+QUAD_TRIANGLES = np.array([0, 1, 2, 2, 3, 0], dtype=np.int32)
+
+# Mesh indices are 16 bit, so one Mesh holds at most 65536 vertices
+MAX_MESH_SLOTS = 65536 // 4
+
+
+class MapLayer:
+    """
+    A columns x rows grid of tile slots held in one vertex array.
+
+    The slots are drawn by one Mesh per MAX_MESH_SLOTS of them, each reading its part of the vertex array in place.
+    Slots are changed with set_origin / set_slots and flush only re-uploads the Meshes whose slots changed.
+    """
+
+    def __init__(self, columns: int, rows: int, tile_size: int):
+        self.columns = columns
+        self.rows = rows
+        self.tile_size = tile_size
+        self.uv_dict: Dict[str, UVRect] = {}
+
+        self.vertices = np.zeros((columns, rows, 4, VERTEX_SIZE), dtype=np.float32)
+        slot_vertices = self.vertices.reshape(columns * rows, 4 * VERTEX_SIZE)
+        # Slot (x, y) is drawn by mesh (x * rows + y) // MAX_MESH_SLOTS
+        self.mesh_vertices: List[memoryview] = [
+            memoryview(slot_vertices[start:start + MAX_MESH_SLOTS].ravel())
+            for start in range(0, columns * rows, MAX_MESH_SLOTS)
+        ]
+        self.dirty = np.ones(len(self.mesh_vertices), dtype=bool)  # Meshes to re-upload
+
+        self.render_context = RenderContext(
+            use_parent_projection=True, use_parent_modelview=True, use_parent_frag_modelview=True
+        )
+        self.render_context.shader.vs = VERTEX_SHADER
+        self.render_context.shader.fs = FRAGMENT_SHADER
+        self.meshes: List[Mesh] = []
+        with self.render_context:
+            for vertices in self.mesh_vertices:
+                slot_starts = np.arange(len(vertices) // (4 * VERTEX_SIZE), dtype=np.int32)[:, None] * 4
+                indices = (slot_starts + QUAD_TRIANGLES).ravel()
+                self.meshes.append(Mesh(fmt=VERTEX_FORMAT, mode="triangles", indices=indices.tolist()))
+
+    def set_atlas(self, atlas: Texture, uv_dict: Dict[str, UVRect]) -> None:
+        for mesh in self.meshes:
+            mesh.texture = atlas
+        self.uv_dict = uv_dict
+
+    def set_origin(self, x: float, y: float) -> None:
+        """Position every slot, with slot (0, 0) drawn at (x, y)."""
+        slot_x = x + np.arange(self.columns, dtype=np.float32) * self.tile_size
+        slot_y = y + np.arange(self.rows, dtype=np.float32) * self.tile_size
+        self.vertices[:, :, :, 0] = slot_x[:, None, None] + QUAD_CORNERS[:, 0] * self.tile_size
+        self.vertices[:, :, :, 1] = slot_y[None, :, None] + QUAD_CORNERS[:, 1] * self.tile_size
+        self.dirty[:] = True
+
+    def set_slots(self,
+                  slots: Iterable[Tuple[int, int]],
+                  tile_names: Iterable[str],
+                  hues: Iterable[Tuple[float, float, float, float]]) -> None:
+        """Assign the texture and hue of each given slot."""
+        for (x, y), tile_name, hue in zip(slots, tile_names, hues):
+            self.vertices[x, y, :, 2:4] = np.reshape(self.uv_dict[tile_name], (4, 2))
+            self.vertices[x, y, :, 4:8] = hue
+            self.dirty[(x * self.rows + y) // MAX_MESH_SLOTS] = True
+
+    def flush(self) -> None:
+        """Upload the vertices of each Mesh whose slots changed."""
+        for index in np.flatnonzero(self.dirty):
+            # Setting the vertices flags the Mesh for upload, it reads them from the vertex array without a copy
+            self.meshes[index].vertices = self.mesh_vertices[index]
+        self.dirty[:] = False
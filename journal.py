@@ -0,0 +1,184 @@
+"""
+journal.py
+Append-only journal of the player's actions, replayed on top of the last save after a crash.
+
+Saves are only written every few turns, see autosave.py.  In between, each turn the player takes is appended to the
+journal as one JSON line: the action's type and parameters, items given by their place in the player's inventory.
+Level up choices, which are not actions, are journaled as well.  The state of the game's random streams is
+checkpointed every RNG_CHECKPOINT_INTERVAL turns and at the start of each segment.
+
+The journal is split in segments, each starting at the turn of a save.  A new segment is started whenever a save is
+taken, and the older ones are deleted once that save is on disk.  Loading a save then replays the records from its
+turn on, from the RNG checkpoint of that turn, and stops early if the game drifts from a later checkpoint.
+
+Records are flushed as they are written, so they outlive a crash of the game, not of the system.
+"""
+from __future__ import annotations
+
+import glob
+import json
+import os
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+import actions
+from entity import Item
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+RNG_CHECKPOINT_INTERVAL = 50  # Turns between checkpoints of the RNG state
+
+# Actions that can be journaled, by name
+ACTION_TYPES = {
+    name: value for name, value in vars(actions).items()
+    if isinstance(value, type) and issubclass(value, actions.Action) and value is not actions.Action
+}
+
+# Level ups that can be journaled, each a method of Level
+LEVEL_UPS = ("increase_max_hp", "increase_power", "increase_defense")
+
+Record = Dict[str, Any]
+
+
+def segment_path(prefix: str, start_turn: int) -> str:
+    return f"{prefix}.{start_turn}.journal"
+
+
+def segment_paths(prefix: str) -> List[Tuple[int, str]]:
+    """Return the journal segments written for `prefix`, as (start turn, path), oldest first."""
+    segments = []
+    for path in glob.glob(glob.escape(prefix) + ".*.journal"):
+        start_turn = path[len(prefix) + 1: -len(".journal")]
+        if start_turn.isdigit():
+            segments.append((int(start_turn), path))
+    return sorted(segments)
+
+
+def rng_checkpoint(engine: Engine) -> Record:
+    """Return a record of the state the game's random streams are in at the start of the current turn."""
+    return {"turn": engine.turn, "rng": engine.rng.getstate()}
+
+
+def action_record(engine: Engine, action: actions.Action) -> Optional[Record]:
+    """Return a record of the player's action, taken before the action is performed.
+
+    Returns None for actions that cannot be journaled: actions of other actors or of unknown types.
+    """
+    if action.entity is not engine.player or ACTION_TYPES.get(type(action).__name__) is not type(action):
+        return None
+
+    params = {}
+    for name, value in vars(action).items():
+        if name == "entity":
+            continue
+        if isinstance(value, Item):
+            value = {"inventory_item": engine.player.inventory.items.index(value)}
+        elif isinstance(value, tuple):
+            value = list(value)
+        params[name] = value
+    return {"turn": engine.turn, "actor": "player", "action": type(action).__name__, "params": params}
+
+
+def decode_action(engine: Engine, record: Record) -> actions.Action:
+    """Return the action of an action record, to be performed by the player."""
+    params = {}
+    for name, value in record["params"].items():
+        if isinstance(value, dict):
+            value = engine.player.inventory.items[value["inventory_item"]]
+        elif isinstance(value, list):
+            value = tuple(value)
+        params[name] = value
+    return ACTION_TYPES[record["action"]](engine.player, **params)
+
+
+def read_records(prefix: str) -> Iterator[Record]:
+    """Yield the records of every segment, oldest first.
+
+    A segment ends at its first unreadable line, the record being written when the game crashed.
+    """
+    for _, path in segment_paths(prefix):
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    break
+
+
+def replay(engine: Engine, prefix: str) -> int:
+    """Replay the journal on top of a freshly loaded save, returns the number of turns replayed.
+
+    Nothing is replayed without an RNG checkpoint for the save's turn, as the turns would not play out the same.
+    """
+    records = [record for record in read_records(prefix) if record["turn"] >= engine.turn]
+    if not records or "rng" not in records[0] or records[0]["turn"] != engine.turn:
+        return 0
+    engine.rng.setstate(records[0]["rng"])
+
+    start_turn = engine.turn
+    for record in records[1:]:
+        if record["turn"] != engine.turn:
+            break  # A turn is missing.
+        if "rng" in record:
+            if engine.rng.getstate() != record["rng"]:
+                break  # The replay drifted from the game.
+        elif "level_up" in record:
+            if record["level_up"] not in LEVEL_UPS or not engine.player.level.requires_level_up:
+                break
+            getattr(engine.player.level, record["level_up"])()
+        elif not engine.handle_action(decode_action(engine, record)):
+            break
+    return engine.turn - start_turn
+
+
+class Journal:
+    def __init__(self, prefix: str):
+        self.prefix = prefix  # Segment files are named prefix.<start turn>.journal
+        self.file: Optional[IO[str]] = None
+        self.turn_record: Optional[Record] = None  # Record of the action being performed
+
+    def write(self, record: Record) -> None:
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def start_segment(self, engine: Engine) -> None:
+        """Start a new segment at the current turn, to be replayed on top of a save taken now."""
+        self.close()
+        self.file = open(segment_path(self.prefix, engine.turn), "w")
+        self.write(rng_checkpoint(engine))
+
+    def drop_segments_before(self, turn: int) -> None:
+        """Delete the segments started before `turn`, once the save of `turn` is on disk.
+
+        Can be called from another thread, the segment being written to is never deleted.
+        """
+        for start_turn, path in segment_paths(self.prefix):
+            if start_turn < turn:
+                os.remove(path)
+
+    def begin_turn(self, engine: Engine, action: actions.Action) -> None:
+        """Called before the player's action is performed, while its items are still where they were."""
+        self.turn_record = action_record(engine, action)
+
+    def end_turn(self, engine: Engine) -> None:
+        """Called once the player's action took a turn, appends its record."""
+        record, self.turn_record = self.turn_record, None
+        if self.file is None:
+            return  # No save to replay it on yet.
+        if record is None:
+            # An action that cannot be replayed, the turns after it are only kept from the next save on.
+            self.close()
+            return
+        self.write(record)
+        if engine.turn % RNG_CHECKPOINT_INTERVAL == 0:
+            self.write(rng_checkpoint(engine))
+
+    def record_level_up(self, engine: Engine, level_up: str) -> None:
+        """Append a level up of the player, the name of a Level method in LEVEL_UPS."""
+        if self.file is not None:
+            self.write({"turn": engine.turn, "level_up": level_up})
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-import os
+import time
+import traceback
 
 from typing import Callable, Optional, Tuple, TYPE_CHECKING, Union
 
@@ -13,14 +14,20 @@ from actions import (
     PickupAction,
     WaitAction,
 )
+from autosave import Autosaver
+from journal import Journal
 import color
 import exceptions
+import save_slots
+import setup_game
 
 from kivy.event import EventDispatcher
 from kivy.lang import Builder
 from kivy.graphics import Color, Line, Rectangle
+from kivy.graphics.texture import Texture
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.floatlayout import FloatLayout
+from kivy.uix.image import Image
 from kivy.uix.label import Label
 from kivy.uix.widget import Widget
 
@@ -71,6 +78,11 @@ WAIT_KEYS = {
     "backspace",
 }
 
+# Main menu keys loading each save slot
+SLOT_KEYS = {
+    str(slot): slot for slot in range(1, save_slots.SLOT_COUNT + 1)
+}
+
 # WAIT_KEYS = {
 #     tcod.event.K_PERIOD,
 #     tcod.event.K_KP_5,
@@ -195,20 +207,7 @@ class EventHandler(BaseEventHandler):
 
         Returns True if the action will advance a turn.
         """
-        if action is None:
-
-            return False
-
-        try:
-            action.perform()
-        except exceptions.Impossible as exc:
-            self.engine.message_log.add_message(exc.args[0], color.impossible)
-            return False  # Skip enemy turn on exceptions.
-
-        self.engine.handle_enemy_turns()
-
-        self.engine.update_fov()
-        return True
+        return self.engine.handle_action(action)
 
     def on_render(self, root_widget: Widget, dt: float) -> None:
         self.engine.render(root_widget, dt)
@@ -345,10 +344,17 @@ class LevelUpEventHandler(AskUserEventHandler):
         if 0 <= index <= 2:
             if index == 0:
                 player.level.increase_max_hp()
+                level_up = "increase_max_hp"
             elif index == 1:
                 player.level.increase_power()
+                level_up = "increase_power"
             else:
                 player.level.increase_defense()
+                level_up = "increase_defense"
+            if self.engine.journal:
+                self.engine.journal.record_level_up(self.engine, level_up)
+            if self.engine.recorder:
+                self.engine.recorder.record_level_up(self.engine, level_up)
         else:
             self.engine.message_log.add_message("Invalid entry.", color.invalid)
 
@@ -753,8 +759,11 @@ class GameOverEventHandler(EventHandler):
 
     def on_quit(self) -> None:
         """Handle exiting out of a finished game."""
-        if os.path.exists("savegame.sav"):
-            os.remove("savegame.sav")  # Deletes the active save file.
+        if self.engine.journal:
+            self.engine.journal.close()
+        if self.engine.autosaver:
+            self.engine.autosaver.wait(self.engine)
+            save_slots.delete(self.engine.autosaver.slot)  # Deletes the active save slot.
         raise exceptions.QuitWithoutSaving()  # Avoid saving a finished game.
 
     def ev_quit(self, event: tcod.event.Quit) -> None:
@@ -867,3 +876,123 @@ class HistoryViewer(EventHandler):
     def ev_mousebutton(self, event: str) -> Optional[BaseEventHandler]:
         # Might be Able to Click on Messages
         return None
+
+
+class MainMenu(BaseEventHandler):
+    """Handle the main menu rendering and input.
+
+    The save slots are listed from their index files, only the slot picked is loaded.
+    """
+
+    def __on_enter__(self, root_widget: Widget) -> None:
+        # Background Picture
+        self.bg_image = Image(source="assets/menu_background.png", allow_stretch=True)
+        self.bg_image.size = 300, 300
+        self.bg_image.pos_hint = {"center_x": 0.5, "center_y": 0.5}
+        root_widget.add_widget(self.bg_image)
+
+        # Menu Options
+        menu_title_color = [c/255 for c in color.menu_title] + [1]
+
+        text = (
+            "Tombs of the Ancient Kings\n\n\n\n[N] Play a new game\n\n[C] Continue last game\n\n"
+            f"[1-{save_slots.SLOT_COUNT}] Load a save slot\n\n[Q] Quit"
+        ).upper()
+        self.title_label = Label(text=text, color=menu_title_color)
+        # self.title_label = Label(text=text, color=menu_title_color, font_name="assets/fonts/whitrabt.ttf")
+        root_widget.add_widget(self.title_label)
+
+        # Save Slots
+        self.slots_layout = BoxLayout(orientation="horizontal", size_hint=(0.9, 0.25))
+        self.slots_layout.pos_hint = {"center_x": 0.5, "y": 0.02}
+        for slot, info in enumerate(save_slots.list_slots(), start=1):
+            self.slots_layout.add_widget(self.slot_widget(slot, info, menu_title_color))
+        root_widget.add_widget(self.slots_layout)
+
+    @staticmethod
+    def slot_widget(slot: int, info: Optional[save_slots.SlotInfo], text_color: list) -> Widget:
+        """Return the thumbnail and summary of a save slot."""
+        layout = BoxLayout(orientation="vertical")
+        if info is None:
+            layout.add_widget(Label(text=f"[{slot}] Empty slot".upper(), color=text_color))
+            return layout
+
+        thumbnail = Texture.create(size=info.thumbnail_size, colorfmt="rgb")
+        thumbnail.blit_buffer(info.thumbnail, colorfmt="rgb", bufferfmt="ubyte")
+        thumbnail.flip_vertical()  # The pixels go from the top row down, textures from the bottom up.
+        thumbnail.mag_filter = "nearest"
+        layout.add_widget(Image(texture=thumbnail, allow_stretch=True))
+
+        saved_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(info.saved_at))
+        text = (
+            f"[{slot}] Floor {info.floor}, level {info.level}\n"
+            f"HP {info.hp}/{info.max_hp}, turn {info.turn}\n"
+            f"{saved_at}"
+        )
+        layout.add_widget(Label(text=text.upper(), color=text_color, halign="center"))
+        return layout
+
+    def __on_exit__(self, root_widget: Widget) -> None:
+        root_widget.clear_widgets()
+        self.bg_image = None
+        self.title_label = None
+        self.slots_layout = None
+        # root_widget.update(0)
+
+    def on_render(self, root_widget: Widget, dt: float) -> None:
+        return None
+
+    def ev_keydown(self, event: str) -> Optional[BaseEventHandler]:
+        if event in ("q", "escape"):
+            raise SystemExit()
+        elif event == "c" or event in SLOT_KEYS:
+            slot = SLOT_KEYS[event] if event in SLOT_KEYS else save_slots.latest_slot()
+            if slot is None:
+                return PopupMessage(self, "No saved game to load.")
+            try:
+                engine = save_slots.load(slot)
+            except FileNotFoundError:
+                print("No saved game to load.")
+                return PopupMessage(self, "No saved game to load.")
+            except Exception as exc:
+                traceback.print_exc()  # Print to stderr.
+                print(traceback.print_exc(), exc)
+                return PopupMessage(self, f"Failed to load save:\n{exc}")
+        elif event == "n":
+            slot = save_slots.free_slot()
+            if slot is None:
+                return OverwriteSlotPopup(
+                    self,
+                    f"Every save slot is full.\n[1-{save_slots.SLOT_COUNT}] Overwrite a slot with a new game\n"
+                    "Any other key to go back",
+                )
+            engine = setup_game.new_game()
+        else:
+            return None
+
+        return self.start_game(engine, slot)
+
+    @staticmethod
+    def start_game(engine: Engine, slot: int) -> BaseEventHandler:
+        """Play a game, saved to `slot` from now on."""
+        engine.journal = Journal(save_slots.journal_prefix(slot))
+        engine.autosaver = Autosaver(slot)
+        engine.autosaver.save(engine)  # The journal starts on top of this save.
+        return MainGameEventHandler(engine)
+
+    def ev_mousebutton(self, event: str) -> Optional[BaseEventHandler]:
+        pass
+    #     return super(MainMenu, self).ev_mousebutton(event)
+
+
+class OverwriteSlotPopup(PopupMessage):
+    """Asks which save slot a new game overwrites, when every slot is full."""
+
+    parent: MainMenu
+
+    def ev_keydown(self, event: str) -> Optional[BaseEventHandler]:
+        if event not in SLOT_KEYS:
+            return self.parent
+        slot = SLOT_KEYS[event]
+        save_slots.delete(slot)  # Along with its journal, which must not be replayed on top of the new game.
+        return self.parent.start_game(setup_game.new_game(), slot)
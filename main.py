@@ -5,8 +5,8 @@ from typing import Dict, Tuple
 
 import color
 import exceptions
-import setup_game
 import kivy_input_handlers
+import save_slots
 
 from kivy.app import App
 from kivy.lang import Builder
@@ -23,10 +23,10 @@ Builder.load_string("""
 """)
 
 
-def save_game(handler: kivy_input_handlers.BaseEventHandler, filename: str) -> None:
-    """If the current event handler has an active Engine then save it."""
-    if isinstance(handler, kivy_input_handlers.EventHandler):
-        handler.engine.save_as(filename)
+def save_game(handler: kivy_input_handlers.BaseEventHandler) -> None:
+    """If the current event handler has an active Engine then save it to its slot."""
+    if isinstance(handler, kivy_input_handlers.EventHandler) and handler.engine.autosaver:
+        save_slots.save(handler.engine, handler.engine.autosaver.slot)
         print("Game saved.")
 
 
@@ -39,7 +39,7 @@ class RoguelikeKivy(FloatLayout):
         super(RoguelikeKivy, self).__init__(**kwargs)
 
         # Initialize Handler
-        self.handler = setup_game.MainMenu()
+        self.handler = kivy_input_handlers.MainMenu()
         self.handler.__on_enter__(root_widget=self)
         self.t = 0
 
@@ -101,10 +101,10 @@ class RoguelikeKivy(FloatLayout):
         except exceptions.QuitWithoutSaving:
             raise
         except SystemExit:  # Save and quit.
-            save_game(self.handler, "savegame.sav")
+            save_game(self.handler)
             raise
         # except BaseException:  # Save on any other unexpected exception.
-        #     save_game(self.handler, "savegame.sav")
+        #     save_game(self.handler)
         #     raise
         except Exception:  # Handle exceptions in game.
             traceback.print_exc()  # Print error to stderr.
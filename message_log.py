@@ -1,10 +1,13 @@
-from typing import Iterable, List, Reversible, Tuple
-import textwrap
+from __future__ import annotations
 
-from kivy.uix.widget import Widget
+from typing import Iterable, List, Reversible, Tuple, TYPE_CHECKING
+import textwrap
 
 import color
 
+if TYPE_CHECKING:
+    from kivy.uix.widget import Widget
+
 
 class Message:
     def __init__(self, text: str, fg: Tuple[int, int, int]):
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 import random, sys
-from typing import Dict, Iterator, List, Tuple, TYPE_CHECKING
+from typing import Dict, Iterator, List, Optional, Tuple, TYPE_CHECKING
 
 import numpy as np
 import tcod
 
-from bitmasking import Bitmasking
 import entity_factories
-from game_map import GameMap
+from game_map import GameMap, new_game_map
 import tile_types
 
 
@@ -62,6 +61,7 @@ def get_entities_at_random(
     weighted_chances_by_floor: Dict[int, List[Tuple[Entity, int]]],
     number_of_entities: int,
     floor: int,
+    rng: random.Random,
 ) -> List[Entity]:
     entity_weighted_chances = {}
 
@@ -78,7 +78,7 @@ def get_entities_at_random(
     entities = list(entity_weighted_chances.keys())
     entity_weighted_chance_values = list(entity_weighted_chances.values())
 
-    chosen_entities = random.choices(
+    chosen_entities = rng.choices(
         entities, weights=entity_weighted_chance_values, k=number_of_entities
     )
 
@@ -114,36 +114,37 @@ class RectangularRoom:
         )
 
 
-def place_entities(room: RectangularRoom, dungeon: GameMap, floor_number: int,) -> None:
-    number_of_monsters = random.randint(
+def place_entities(room: RectangularRoom, dungeon: GameMap, floor_number: int, rng: random.Random) -> None:
+    number_of_monsters = rng.randint(
         0, get_max_value_for_floor(max_monsters_by_floor, floor_number)
     )
-    number_of_items = random.randint(
+    number_of_items = rng.randint(
         0, get_max_value_for_floor(max_items_by_floor, floor_number)
     )
 
     monsters: List[Entity] = get_entities_at_random(
-        enemy_chances, number_of_monsters, floor_number
+        enemy_chances, number_of_monsters, floor_number, rng
     )
     items: List[Entity] = get_entities_at_random(
-        item_chances, number_of_items, floor_number
+        item_chances, number_of_items, floor_number, rng
     )
 
     for entity in monsters + items:
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
+        x = rng.randint(room.x1 + 1, room.x2 - 1)
+        y = rng.randint(room.y1 + 1, room.y2 - 1)
 
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
+        # Keep the player's starting tile free as well, the player is only placed once the floor is entered.
+        if not dungeon.get_entities_at_location(x, y) and (x, y) != dungeon.start_location:
             entity.spawn(dungeon, x, y)
 
 
 def tunnel_between(
-    start: Tuple[int, int], end: Tuple[int, int]
+    start: Tuple[int, int], end: Tuple[int, int], rng: random.Random
 ) -> Iterator[Tuple[int, int]]:
     """Return an L-shaped tunnel between these two points."""
     x1, y1 = start
     x2, y2 = end
-    if random.random() < 0.5:  # 50% chance.
+    if rng.random() < 0.5:  # 50% chance.
         # Move horizontally, then vertically.
         corner_x, corner_y = x2, y1
     else:
@@ -164,21 +165,31 @@ def generate_dungeon(
     map_width: int,
     map_height: int,
     engine: Engine,
+    floor_number: int,
+    rng: random.Random,
+    spawn_rng: Optional[random.Random] = None,
 ) -> GameMap:
-    """Generate a new dungeon map."""
-    player = engine.player
-    dungeon = GameMap(engine, map_width, map_height, entities=[player])
+    """Generate a new dungeon map.
+
+    The layout is drawn from `rng` and the monsters and items from `spawn_rng`, or from `rng` as well if it is not
+    given.  Nothing else is used for randomness and no game state is touched, so a floor can be generated in the
+    background.
+    The player is not placed on the map; it starts at the map's start_location.
+    """
+    dungeon = new_game_map(engine, map_width, map_height)
+    if spawn_rng is None:
+        spawn_rng = rng
 
     rooms: List[RectangularRoom] = []
 
     center_of_last_room = (0, 0)
 
     for r in range(max_rooms):
-        room_width = random.randint(room_min_size, room_max_size)
-        room_height = random.randint(room_min_size, room_max_size)
+        room_width = rng.randint(room_min_size, room_max_size)
+        room_height = rng.randint(room_min_size, room_max_size)
 
-        x = random.randint(1, dungeon.width - room_width - 2)
-        y = random.randint(1, dungeon.height - room_height - 2)
+        x = rng.randint(1, dungeon.width - room_width - 2)
+        y = rng.randint(1, dungeon.height - room_height - 2)
 
         # "RectangularRoom" class makes rectangles easier to work with
         new_room = RectangularRoom(x, y, room_width, room_height)
@@ -189,45 +200,38 @@ def generate_dungeon(
         # If there are no intersections then the room is valid.
 
         # Dig out this rooms inner area.
-        dungeon.tiles[new_room.inner] = tile_types.floor
+        dungeon.tile_ids[new_room.inner] = tile_types.FLOOR
 
         if len(rooms) == 0:
             # The first room, where the player starts.
-            player.place(*new_room.center, dungeon)
+            dungeon.start_location = new_room.center
+            if floor_number > 1:
+                # Stairs back up to the previous floor, where the player arrives.
+                dungeon.upstairs_location = new_room.center
         else:  # All rooms after the first.
             # Dig out a tunnel between this room and the previous one.
-            for x, y in tunnel_between(rooms[-1].center, new_room.center):
-                dungeon.tiles[x, y] = tile_types.floor
+            for x, y in tunnel_between(rooms[-1].center, new_room.center, rng):
+                dungeon.tile_ids[x, y] = tile_types.FLOOR
 
             center_of_last_room = new_room.center
 
-        place_entities(new_room, dungeon, engine.game_world.current_floor)
+        place_entities(new_room, dungeon, floor_number, spawn_rng)
 
-        dungeon.tiles[center_of_last_room] = tile_types.down_stairs
+        dungeon.tile_ids[center_of_last_room] = tile_types.DOWN_STAIRS
         dungeon.downstairs_location = center_of_last_room
 
         # Finally, append the new room to the list.
         rooms.append(new_room)
     # print(dungeon.tiles)
 
+    # After the tunnels, which start from the first room's center
+    if dungeon.upstairs_location:
+        dungeon.tile_ids[dungeon.upstairs_location] = tile_types.UP_STAIRS
+
+    dungeon.refresh_tile_views()
+
     # Bit Masking for Walls Prior to Placing Any Map "Objects"
-    dungeon.walkable_bitmasking = Bitmasking.generate(dungeon.tiles['walkable'])
-
-    # Reset all Values in a Perimeter around Map(weird bit masking issues)
-    BLANK_TILE = 255
-    for x in range(dungeon.width):
-        dungeon.walkable_bitmasking[x][dungeon.height - 1] = BLANK_TILE
-        dungeon.walkable_bitmasking[x][0] = BLANK_TILE
-
-    for y in range(dungeon.height):
-        dungeon.walkable_bitmasking[dungeon.width - 1][y] = BLANK_TILE
-        dungeon.walkable_bitmasking[0][y] = BLANK_TILE
-
-    # Weird Bottom Left Corner Bug?
-    BOTTOM_LEFT_CORNER = 5
-    dungeon.walkable_bitmasking[1][1] = BLANK_TILE
-    if dungeon.walkable_bitmasking[1][2] != 255 and dungeon.walkable_bitmasking[2][1] != 255:
-        dungeon.walkable_bitmasking[1][1] = BOTTOM_LEFT_CORNER
+    dungeon.generate_bitmasking()
 
     # Printing for Reference
     # wall_space_print = np.rot90(dungeon.walkable_bitmasking, k=1, axes=(0, 1))
@@ -0,0 +1,202 @@
+"""
+replay.py
+Record the inputs of a game to a replay file, and re-run the game from it headless, checking it plays out the same.
+
+A replay file is JSON lines.  The first line is a header with the format, its version and the game's master seed.
+Each following line is one input, as journal.py records them: a player action taking a turn or a level up choice,
+with the hash of the game state once the input was handled.  As every random draw of the game comes from streams
+derived from the master seed, see rng_streams.py, the same inputs on the same seed must give the same hashes, so
+replaying a file checks every turn of a game for behaviour drift, such as after a performance change.
+
+Run from the repository root:
+    python -m replay record <file> [--seed SEED] [--turns TURNS]
+        Play a game with random inputs and record it.
+    python -m replay check <file>
+        Replay a recorded game and report the first turn whose state differs from the recording.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from typing import IO, Optional, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+import actions
+from components.ai import ConfusedEnemy
+from components.consumable import ConfusionConsumable, HealingConsumable
+import exceptions
+import journal
+from journal import Record
+import setup_game
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+REPLAY_FORMAT = "rlkivy-replay"
+REPLAY_VERSION = 1
+
+
+def state_hash(engine: Engine) -> str:
+    """Return a hash of the state a game is in: turn, floor, player, RNG streams, entities and what the player sees.
+
+    Only the field of view is hashed of the map, so hashing stays cheap on maps of any size.
+    """
+    player = engine.player
+    game_map = engine.game_map
+    fov_window = engine.fov_window(player.x, player.y)
+    state = (
+        engine.turn,
+        engine.game_world.current_floor,
+        (player.fighter.hp, player.fighter.max_hp, player.fighter.power, player.fighter.defense),
+        (player.level.current_level, player.level.current_xp),
+        [item.name for item in player.inventory.items],
+        engine.rng.getstate(),
+        sorted(
+            (entity.x, entity.y, entity.name, entity.fighter.hp if getattr(entity, "fighter", None) else -1)
+            for entity in game_map.entities
+        ),
+        (fov_window[0].start, fov_window[1].start),
+    )
+    digest = hashlib.blake2b(repr(state).encode(), digest_size=16)
+    digest.update(np.ascontiguousarray(game_map.visible[fov_window]).tobytes())
+    return digest.hexdigest()
+
+
+class ReplayRecorder:
+    """Records the inputs of a game to a replay file, through the same hooks as Journal."""
+
+    def __init__(self, filename: str, engine: Engine):
+        self.file: IO[str] = open(filename, "w")
+        self.turn_record: Optional[Record] = None  # Record of the action being performed
+        self.write({"format": REPLAY_FORMAT, "version": REPLAY_VERSION, "seed": engine.rng.master_seed})
+
+    def write(self, record: Record) -> None:
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def begin_turn(self, engine: Engine, action: actions.Action) -> None:
+        self.turn_record = journal.action_record(engine, action)
+        if self.turn_record is None:
+            raise ValueError(f"{type(action).__name__} cannot be recorded.")
+
+    def end_turn(self, engine: Engine) -> None:
+        record, self.turn_record = self.turn_record, None
+        self.write({**record, "hash": state_hash(engine)})
+
+    def record_level_up(self, engine: Engine, level_up: str) -> None:
+        self.write({"turn": engine.turn, "level_up": level_up, "hash": state_hash(engine)})
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def check(filename: str) -> int:
+    """Replay a recorded game, returns the number of inputs replayed.
+
+    Raises ReplayDrift at the first input after which the game's state differs from the recording.
+    """
+    with open(filename) as f:
+        header = json.loads(f.readline())
+        if header.get("format") != REPLAY_FORMAT:
+            raise exceptions.SaveFormatError(f"{filename} is not a replay file.")
+        if header["version"] > REPLAY_VERSION:
+            raise exceptions.SaveFormatError(f"The replay file is version {header['version']}, newer than this game.")
+
+        engine = setup_game.new_game(seed=header["seed"])
+        inputs = 0
+        for line in f:
+            record = json.loads(line)
+            if record["turn"] != engine.turn:
+                raise exceptions.ReplayDrift(f"Turn {engine.turn}: the recording goes on at turn {record['turn']}.")
+            if "level_up" in record:
+                if record["level_up"] not in journal.LEVEL_UPS:
+                    raise exceptions.ReplayDrift(f"Turn {engine.turn}: {record['level_up']!r} is not a level up.")
+                if not engine.player.level.requires_level_up:
+                    raise exceptions.ReplayDrift(f"Turn {engine.turn}: the player no longer levels up.")
+                getattr(engine.player.level, record["level_up"])()
+            elif not engine.handle_action(journal.decode_action(engine, record)):
+                raise exceptions.ReplayDrift(f"Turn {engine.turn}: {record['action']} no longer takes a turn.")
+            if state_hash(engine) != record["hash"]:
+                raise exceptions.ReplayDrift(f"Turn {record['turn']}: the state differs from the recording.")
+            inputs += 1
+    return inputs
+
+
+def bot_action(engine: Engine, rng: random.Random) -> actions.Action:
+    """Return a random action for the player: wander or head for the down stairs, fighting whatever is in the way,
+    pick up what it stands on, heal when hurt and confuse the monsters next to it.
+    """
+    player = engine.player
+    game_map = engine.game_map
+    for item in player.inventory.items:
+        if isinstance(item.consumable, HealingConsumable) and player.fighter.hp < player.fighter.max_hp // 2:
+            return actions.ItemAction(player, item)
+        if isinstance(item.consumable, ConfusionConsumable):
+            for dx, dy in ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+                target = game_map.get_actor_at_location(player.x + dx, player.y + dy)
+                if target and not isinstance(target.ai, ConfusedEnemy):
+                    return actions.ItemAction(player, item, (target.x, target.y))
+    if (player.x, player.y) == game_map.downstairs_location:
+        return actions.TakeStairsAction(player)
+    if any(item.x == player.x and item.y == player.y for item in game_map.items):
+        if len(player.inventory.items) < player.inventory.capacity:
+            return actions.PickupAction(player)
+    if rng.random() < 0.5:
+        path = game_map.get_pathfinder_to(*game_map.downstairs_location).path_from((player.x, player.y))[1:].tolist()
+        if path:
+            return actions.BumpAction(player, path[0][0] - player.x, path[0][1] - player.y)
+    dx, dy = rng.choice([-1, 0, 1]), rng.choice([-1, 0, 1])
+    if not dx and not dy:
+        return actions.WaitAction(player)
+    return actions.BumpAction(player, dx, dy)
+
+
+def record(filename: str, seed: int, turns: int) -> int:
+    """Play a game with random inputs for up to `turns` turns, or until the player dies, and record it."""
+    engine = setup_game.new_game(seed=seed)
+    engine.recorder = ReplayRecorder(filename, engine)
+    rng = random.Random(seed)  # The inputs, apart from the game's own streams
+    try:
+        while engine.turn < turns and engine.player.is_alive:
+            engine.handle_action(bot_action(engine, rng))
+            if engine.player.level.requires_level_up:
+                level_up = rng.choice(journal.LEVEL_UPS)
+                getattr(engine.player.level, level_up)()
+                engine.recorder.record_level_up(engine, level_up)
+    finally:
+        engine.recorder.close()
+    return engine.turn
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m replay", description="Record and check replays of games.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_command = commands.add_parser("record", help="play a game with random inputs and record it")
+    record_command.add_argument("file")
+    record_command.add_argument("--seed", type=int, default=0)
+    record_command.add_argument("--turns", type=int, default=1000)
+    check_command = commands.add_parser("check", help="replay a recorded game, checking every turn")
+    check_command.add_argument("file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "record":
+        turns = record(args.file, args.seed, args.turns)
+        print(f"Recorded {turns} turns to {args.file} in {time.perf_counter() - start:.2f} s.")
+        return
+
+    try:
+        inputs = check(args.file)
+    except exceptions.ReplayDrift as exc:
+        print(f"Drift: {exc}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {inputs} inputs in {elapsed:.2f} s ({inputs / elapsed:.0f} inputs/s), no drift.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+rng_streams.py
+Independent random number streams of a game, each derived from its master seed.
+
+Each system draws from its own named stream rather than from the `random` module, so a change to how often one system
+draws leaves the others' draws as they were, and a game replays the same from its seed and inputs.  The streams are
+part of the game's state and are saved with it.
+
+Floors are generated from streams of their own, derived from the master seed and the floor number, so they come out
+the same in whatever order they are generated, including in the background.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+from typing import Dict, List
+
+# The streams of a game:
+# - procgen: the layout of floors, per floor
+# - spawning: the monsters and items placed on floors, per floor
+# - ai: the choices of monsters, such as the direction a confused monster stumbles in
+# - combat: the outcome of attacks
+STREAMS = ("procgen", "spawning", "ai", "combat")
+FLOOR_STREAMS = ("procgen", "spawning")  # Streams derived for each floor rather than drawn from in turn order
+
+
+def derive_seed(master_seed: int, *names: object) -> int:
+    """Return a 64 bit seed for a stream, from the master seed and the stream's name and keys."""
+    key = ":".join(str(name) for name in (master_seed, *names)).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def floor_stream(master_seed: int, name: str, floor: int) -> random.Random:
+    """Return a new stream for generating a floor, always the same for the same floor of the same seed."""
+    if name not in FLOOR_STREAMS:
+        raise KeyError(f"{name!r} is not a floor stream.")
+    return random.Random(derive_seed(master_seed, name, floor))
+
+
+class RngStreams:
+    """The streams of a game drawn from in turn order."""
+
+    def __init__(self, master_seed: int):
+        self.master_seed = master_seed
+        self.streams: Dict[str, random.Random] = {
+            name: random.Random(derive_seed(master_seed, name)) for name in STREAMS if name not in FLOOR_STREAMS
+        }
+
+    @property
+    def ai(self) -> random.Random:
+        return self.streams["ai"]
+
+    @property
+    def combat(self) -> random.Random:
+        return self.streams["combat"]
+
+    def getstate(self) -> Dict[str, List]:
+        """Return the state of every stream, as JSON friendly lists."""
+        state = {}
+        for name, stream in self.streams.items():
+            version, internal_state, gauss_next = stream.getstate()
+            state[name] = [version, list(internal_state), gauss_next]
+        return state
+
+    def setstate(self, state: Dict[str, List]) -> None:
+        for name, (version, internal_state, gauss_next) in state.items():
+            self.streams[name].setstate((version, tuple(internal_state), gauss_next))
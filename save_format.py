@@ -0,0 +1,143 @@
+"""
+save_format.py
+Versioned container for save files.
+
+A save file starts with a fixed header:
+    magic          8 bytes, SAVE_MAGIC
+    version        uint16, the SAVE_VERSION of the game that wrote it
+    codec          uint8, how the sections are compressed, see CODECS
+    block_count    uint32
+    object_offset  uint64
+    object_length  uint64
+followed by an (offset, stored length, length) uint64 triple per block, the object section, and the blocks.
+
+The object section is the saved object pickled with protocol 5.  The numpy arrays it holds (the map arrays, the entity
+table columns and map chunks) are written out of band, each as a block of its own aligned to BLOCK_ALIGNMENT bytes,
+instead of being copied through the pickle stream.  Entities stay in the object section, as the compact attribute
+dicts of their slotted classes.
+
+With the "none" codec the blocks are the arrays' raw memory, so loading maps the file in memory and builds the arrays
+directly on top of it.  The mapping is copy on write: the file is left untouched, and pages are only read when an array
+first touches them.  With the other codecs every block is compressed on its own and decompressed when loaded.
+
+Files that do not start with SAVE_MAGIC, such as the lzma compressed pickles saved before this format, are refused.
+"""
+from __future__ import annotations
+
+import lzma
+import mmap
+import os
+import pickle
+import struct
+from typing import Any, Callable, Dict, List, NamedTuple
+import zlib
+
+from exceptions import SaveFormatError
+
+SAVE_MAGIC = b"RLKIVY\x00S"
+SAVE_VERSION = 1  # Bump when the saved classes change in a way old saves need converting for
+BLOCK_ALIGNMENT = 64  # Blocks start on multiples of this many bytes, so the arrays built on them are aligned
+
+HEADER = struct.Struct("<8sHB5xIQQ")
+BLOCK_ENTRY = struct.Struct("<QQQ")
+
+# Codec name: (ID stored in the header, compress, decompress)
+CODECS: Dict[str, tuple] = {
+    "none": (0, bytes, bytes),
+    "zlib": (1, zlib.compress, zlib.decompress),
+    "lzma": (2, lzma.compress, lzma.decompress),
+}
+CODEC_NAMES = {codec_id: name for name, (codec_id, _, _) in CODECS.items()}
+DEFAULT_CODEC = "zlib"  # Much faster than lzma for a slightly larger file, see benchmarks/save_format.py
+MAPPED_CODEC = "none"  # The codec whose saves are loaded by memory mapping
+
+
+def _align(offset: int) -> int:
+    return -(-offset // BLOCK_ALIGNMENT) * BLOCK_ALIGNMENT
+
+
+class Snapshot(NamedTuple):
+    objects: bytes  # The object section, not compressed yet
+    blocks: List[bytes]  # Copies of the out of band arrays
+
+
+def snapshot(obj: Any) -> Snapshot:
+    """Pickle obj and copy its arrays, so it can be written out later while obj keeps changing."""
+    buffers: List[pickle.PickleBuffer] = []
+    objects = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    return Snapshot(objects, [bytes(buffer.raw()) for buffer in buffers])
+
+
+def save(obj: Any, filename: str, codec: str = DEFAULT_CODEC) -> None:
+    """Write obj to filename."""
+    write(snapshot(obj), filename, codec)
+
+
+def write(snapshot: Snapshot, filename: str, codec: str = DEFAULT_CODEC) -> None:
+    """Compress a snapshot and write it to filename.
+
+    The file is written next to its destination and then moved over it, so a failed save never leaves a broken file
+    behind, and a file mapped by an earlier load is never truncated under the arrays built on it.
+    """
+    codec_id, compress, _ = CODECS[codec]
+    objects = compress(snapshot.objects)
+    raw_blocks = snapshot.blocks
+    blocks = raw_blocks if codec == MAPPED_CODEC else [compress(block) for block in raw_blocks]
+
+    object_offset = HEADER.size + BLOCK_ENTRY.size * len(blocks)
+    offset = object_offset + len(objects)
+    block_offsets = []
+    for block in blocks:
+        offset = _align(offset)
+        block_offsets.append(offset)
+        offset += len(block)
+
+    temporary_filename = f"{filename}.tmp"
+    with open(temporary_filename, "wb") as f:
+        f.write(HEADER.pack(SAVE_MAGIC, SAVE_VERSION, codec_id, len(blocks), object_offset, len(objects)))
+        for block, raw_block, block_offset in zip(blocks, raw_blocks, block_offsets):
+            f.write(BLOCK_ENTRY.pack(block_offset, len(block), len(raw_block)))
+        f.write(objects)
+        for block, block_offset in zip(blocks, block_offsets):
+            f.write(bytes(block_offset - f.tell()))
+            f.write(block)
+    os.replace(temporary_filename, filename)
+
+
+def load(filename: str) -> Any:
+    """Return the object saved in filename by save."""
+    with open(filename, "rb") as f:
+        header = f.read(HEADER.size)
+        if not header.startswith(SAVE_MAGIC):
+            raise SaveFormatError("Saves from before the save format are not supported.")
+
+        if len(header) < HEADER.size:
+            raise SaveFormatError("The save file is truncated.")
+        _, version, codec_id, block_count, object_offset, object_length = HEADER.unpack(header)
+        if version > SAVE_VERSION:
+            raise SaveFormatError(f"The save file is from a newer version of the game (save format {version}).")
+        if codec_id not in CODEC_NAMES:
+            raise SaveFormatError(f"The save file uses an unknown codec ({codec_id}).")
+        codec = CODEC_NAMES[codec_id]
+        block_table = f.read(BLOCK_ENTRY.size * block_count)
+        if len(block_table) < BLOCK_ENTRY.size * block_count:
+            raise SaveFormatError("The save file is truncated.")
+        if codec == MAPPED_CODEC:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        else:
+            f.seek(0)
+            data = f.read()
+
+    view = memoryview(data)
+    entries = [BLOCK_ENTRY.unpack_from(block_table, i * BLOCK_ENTRY.size) for i in range(block_count)]
+    if any(offset + length > len(view) for offset, length, *_ in [(object_offset, object_length), *entries]):
+        raise SaveFormatError("The save file is truncated.")
+
+    decompress: Callable[[Any], bytes] = CODECS[codec][2]
+    objects = decompress(view[object_offset : object_offset + object_length])
+    if codec == MAPPED_CODEC:
+        buffers = [view[offset : offset + length] for offset, length, _ in entries]
+    else:
+        # Copied into bytearrays, as arrays built on the bytes decompress returns would be read only.
+        buffers = [bytearray(decompress(view[offset : offset + length])) for offset, length, _ in entries]
+    return pickle.loads(objects, buffers=buffers)
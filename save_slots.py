@@ -0,0 +1,171 @@
+"""
+save_slots.py
+Numbered save slots, each a save file with a small index file next to it.
+
+The index of a slot holds what the main menu shows of the game saved in it: floor, player level and HP, seed, turn,
+when it was saved, and a thumbnail of the explored map.  It is a few KiB of JSON, so the menu lists every slot without
+loading any save, and only the slot the player picks is loaded in full.
+
+The index is written after its save file, each replaced atomically, so a crash in between leaves an index describing
+the previous save of the slot rather than a broken one.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import os
+import time
+from typing import List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+import journal
+import save_format
+import setup_game
+import tile_types
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+SAVE_DIRECTORY = "saves"
+SLOT_COUNT = 3
+THUMBNAIL_SIZE = 32  # Most pixels on a side of a thumbnail, one pixel standing for one or more tiles
+
+PLAYER_COLOR = (255, 255, 255)  # Thumbnail pixel of the player
+
+
+class SlotInfo(NamedTuple):
+    slot: int
+    floor: int
+    level: int
+    hp: int
+    max_hp: int
+    seed: int
+    turn: int
+    saved_at: float  # time.time() of the save
+    thumbnail_size: Tuple[int, int]  # Width and height
+    thumbnail: bytes  # RGB pixels, row by row from the top
+
+
+def save_path(slot: int, directory: str = SAVE_DIRECTORY) -> str:
+    return os.path.join(directory, f"slot{slot}.sav")
+
+
+def index_path(slot: int, directory: str = SAVE_DIRECTORY) -> str:
+    return os.path.join(directory, f"slot{slot}.json")
+
+
+def journal_prefix(slot: int, directory: str = SAVE_DIRECTORY) -> str:
+    """Return the prefix of the journal segments of a slot, see journal.py."""
+    return os.path.join(directory, f"slot{slot}")
+
+
+def thumbnail(engine: Engine) -> Tuple[Tuple[int, int], bytes]:
+    """Return the size and RGB pixels of a thumbnail of the current floor as the player explored it."""
+    game_map = engine.game_map
+    step = max(1, -(-max(game_map.width, game_map.height) // THUMBNAIL_SIZE))
+    # Sample one tile of each step x step block, as indices into the map's arrays, x by column and y by row.
+    y, x = np.mgrid[0:game_map.height:step, 0:game_map.width:step]
+    height, width = x.shape
+    x, y = x.ravel(), y.ravel()
+
+    colors = tile_types.TILES["dark"]["bg"][game_map.tile_ids[x, y]]
+    colors[~np.asarray(game_map.explored[x, y], dtype=bool)] = tile_types.SHROUD["bg"]
+    colors = colors.reshape(height, width, 3)
+    colors[engine.player.y // step, engine.player.x // step] = PLAYER_COLOR
+    return (width, height), colors.astype(np.uint8).tobytes()
+
+
+def slot_info(engine: Engine, slot: int) -> SlotInfo:
+    """Return the index of a game, as saved to `slot` now."""
+    player = engine.player
+    size, pixels = thumbnail(engine)
+    return SlotInfo(
+        slot=slot,
+        floor=engine.game_world.current_floor,
+        level=player.level.current_level,
+        hp=player.fighter.hp,
+        max_hp=player.fighter.max_hp,
+        seed=engine.game_world.seed,
+        turn=engine.turn,
+        saved_at=time.time(),
+        thumbnail_size=size,
+        thumbnail=pixels,
+    )
+
+
+def write_index(info: SlotInfo, directory: str = SAVE_DIRECTORY) -> None:
+    state = info._asdict()
+    state["thumbnail"] = base64.b64encode(info.thumbnail).decode("ascii")
+    filename = index_path(info.slot, directory)
+    with open(filename + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(filename + ".tmp", filename)
+
+
+def read_index(slot: int, directory: str = SAVE_DIRECTORY) -> Optional[SlotInfo]:
+    """Return the index of a slot, or None if the slot is empty or its index cannot be read."""
+    try:
+        with open(index_path(slot, directory)) as f:
+            state = json.load(f)
+        state["thumbnail_size"] = tuple(state["thumbnail_size"])
+        state["thumbnail"] = base64.b64decode(state["thumbnail"])
+        return SlotInfo(**state)
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def list_slots(directory: str = SAVE_DIRECTORY) -> List[Optional[SlotInfo]]:
+    """Return the index of every slot, None for the empty ones, from the index files alone."""
+    return [read_index(slot, directory) for slot in range(1, SLOT_COUNT + 1)]
+
+
+def latest_slot(directory: str = SAVE_DIRECTORY) -> Optional[int]:
+    """Return the slot saved to last, or None if every slot is empty."""
+    saved = [info for info in list_slots(directory) if info]
+    if not saved:
+        return None
+    return max(saved, key=lambda info: info.saved_at).slot
+
+
+def free_slot(directory: str = SAVE_DIRECTORY) -> Optional[int]:
+    """Return the first empty slot, or None if every slot holds a save."""
+    for slot, info in enumerate(list_slots(directory), start=1):
+        if info is None:
+            return slot
+    return None
+
+
+def write(snapshot: save_format.Snapshot, info: SlotInfo, directory: str = SAVE_DIRECTORY) -> None:
+    """Write a snapshot of a game to the slot of `info`, then its index."""
+    os.makedirs(directory, exist_ok=True)
+    save_format.write(snapshot, save_path(info.slot, directory))
+    write_index(info, directory)
+
+
+def save(engine: Engine, slot: int, directory: str = SAVE_DIRECTORY) -> None:
+    """Save a game to a slot, replacing what it held."""
+    os.makedirs(directory, exist_ok=True)
+    engine.save_as(save_path(slot, directory))
+    write_index(slot_info(engine, slot), directory)
+    if engine.journal:
+        engine.journal.start_segment(engine)
+        engine.journal.drop_segments_before(engine.turn)
+
+
+def load(slot: int, directory: str = SAVE_DIRECTORY) -> Engine:
+    """Load the game saved to a slot, with the turns journaled since.  Raises FileNotFoundError if the slot is empty."""
+    engine = setup_game.load_game(save_path(slot, directory))
+    replayed = journal.replay(engine, journal_prefix(slot, directory))
+    if replayed:
+        engine.message_log.add_message(f"Recovered the last {replayed} turns from the journal.")
+    return engine
+
+
+def delete(slot: int, directory: str = SAVE_DIRECTORY) -> None:
+    """Empty a slot.  The index goes first, so the slot is never listed without its save."""
+    for filename in (index_path(slot, directory), save_path(slot, directory)):
+        if os.path.exists(filename):
+            os.remove(filename)
+    for _, filename in journal.segment_paths(journal_prefix(slot, directory)):
+        os.remove(filename)
@@ -0,0 +1,144 @@
+"""
+scheduler.py
+Energy based turn order for the actors of a GameMap.
+
+Every actor gains `speed` energy per tick and acts once it has gathered ACTION_COST, so its next action is due
+ACTION_COST * TICKS_PER_SPEED // speed ticks after its last one.  Instead of topping up every actor's energy each
+turn, the scheduler keeps a heap of the tick each actor is next due and only wakes the actors whose time has come.
+
+Actors are also simulated at a level of detail that depends on their distance to the player:
+    - within active_radius they act at their full speed,
+    - between active_radius and sleep_radius idle actors get a coarse update, acting once every COARSE_INTERVAL
+      actions, while actors with something to do, such as a path to follow, keep acting at their full speed,
+    - beyond sleep_radius, or on tiles the player has not explored, idle actors go dormant.  Dormant actors are kept
+      out of the heap in buckets of CHUNK_SIZE x CHUNK_SIZE tiles, until the player comes near or a noise wakes them.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Dict, Iterator, List, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from entity import Actor
+
+ACTION_COST = 100  # Energy an action costs
+NORMAL_SPEED = 100  # Speed of the player and of most monsters, one action per turn
+TICKS_PER_SPEED = 100  # Ticks in a turn of a NORMAL_SPEED actor
+
+ACTIVE_RADIUS = 10  # Actors this close to the player are fully simulated, a little past the field of view
+SLEEP_RADIUS = 20  # Idle actors further than this go dormant
+COARSE_INTERVAL = 4  # Idle actors between the two radiuses act once every COARSE_INTERVAL actions
+CHUNK_SIZE = 16  # Width and height of the tile chunks dormant actors are bucketed in
+
+
+def action_delay(actor: Actor) -> int:
+    """Ticks it takes the actor to gather the energy for one action."""
+    return max(1, ACTION_COST * TICKS_PER_SPEED // max(1, actor.speed))
+
+
+class TurnScheduler:
+    def __init__(self, active_radius: int = ACTIVE_RADIUS, sleep_radius: int = SLEEP_RADIUS):
+        self.active_radius = active_radius
+        self.sleep_radius = sleep_radius
+        self.time = 0  # Current tick
+        # (due tick, ticket, actor).  The ticket breaks ties in scheduling order, so actors are never compared.
+        self.queue: List[Tuple[int, int, Actor]] = []
+        # Ticket of each actor's live entry.  Entries whose ticket no longer matches were cancelled and are skipped.
+        self.tickets: Dict[Actor, int] = {}
+        self.next_ticket = 0
+        # Dormant actors by the chunk they sleep in, and the chunk of each dormant actor
+        self.dormant_chunks: Dict[Tuple[int, int], List[Actor]] = {}
+        self.dormant: Dict[Actor, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    def __contains__(self, actor: Actor) -> bool:
+        return actor in self.tickets
+
+    def schedule(self, actor: Actor, coarse: bool = False) -> None:
+        """Queue the actor's next action, replacing any action it already had queued.
+
+        A coarse action is due COARSE_INTERVAL times later than a normal one.
+        """
+        delay = action_delay(actor) * (COARSE_INTERVAL if coarse else 1)
+        self.next_ticket += 1
+        self.tickets[actor] = self.next_ticket
+        heapq.heappush(self.queue, (self.time + delay, self.next_ticket, actor))
+
+    def unschedule(self, actor: Actor) -> None:
+        """Cancel the actor's queued action or wake it from its sleep without scheduling it.
+
+        The heap entry itself is dropped once it comes up.
+        """
+        self.tickets.pop(actor, None)
+        chunk = self.dormant.pop(actor, None)
+        if chunk is not None:
+            self.dormant_chunks[chunk].remove(actor)
+            if not self.dormant_chunks[chunk]:
+                del self.dormant_chunks[chunk]
+
+    def sleep(self, actor: Actor) -> None:
+        """Take the actor out of the schedule until it is woken."""
+        self.unschedule(actor)
+        chunk = actor.x // CHUNK_SIZE, actor.y // CHUNK_SIZE
+        self.dormant[actor] = chunk
+        self.dormant_chunks.setdefault(chunk, []).append(actor)
+
+    def dormant_near(self, x: int, y: int, radius: int) -> List[Actor]:
+        """Return the dormant actors within `radius` tiles (Chebyshev distance) of x, y.
+
+        Only the chunks overlapping the radius are looked at.
+        """
+        found = []
+        for chunk_x in range((x - radius) // CHUNK_SIZE, (x + radius) // CHUNK_SIZE + 1):
+            for chunk_y in range((y - radius) // CHUNK_SIZE, (y + radius) // CHUNK_SIZE + 1):
+                for actor in self.dormant_chunks.get((chunk_x, chunk_y), ()):
+                    if max(abs(actor.x - x), abs(actor.y - y)) <= radius:
+                        found.append(actor)
+        return found
+
+    def wake(self, actor: Actor) -> None:
+        """Wake a dormant actor and queue its next action."""
+        self.unschedule(actor)
+        if actor.is_alive:
+            self.schedule(actor)
+
+    def wake_near_player(self, player_x: int, player_y: int, explored: np.ndarray) -> None:
+        """Wake every dormant actor the player came within sleep_radius of, on explored tiles."""
+        for actor in self.dormant_near(player_x, player_y, self.sleep_radius):
+            if explored[actor.x, actor.y]:
+                self.wake(actor)
+
+    def should_sleep(self, actor: Actor, player_x: int, player_y: int, explored: np.ndarray) -> bool:
+        """Return True if the actor is too far from the player, or on unexplored tiles, to be simulated."""
+        distance = max(abs(actor.x - player_x), abs(actor.y - player_y))
+        return distance > self.sleep_radius or not explored[actor.x, actor.y]
+
+    def is_coarse(self, actor: Actor, player_x: int, player_y: int) -> bool:
+        """Return True if the actor is idle and outside the fully simulated radius around the player."""
+        if not actor.is_alive or not actor.ai.is_idle:
+            return False
+        return max(abs(actor.x - player_x), abs(actor.y - player_y)) > self.active_radius
+
+    def due_actors(self, until: int) -> Iterator[Actor]:
+        """Yield every living actor whose action is due up to tick `until`, in turn order.
+
+        A yielded actor leaves the schedule until it is scheduled again.  The clock is set to its due tick while it
+        is yielded, so scheduling it then queues its following action, which is yielded as well if it is also due by
+        `until`.  Dead actors are dropped from the schedule.
+        """
+        while self.queue and self.queue[0][0] <= until:
+            due, ticket, actor = heapq.heappop(self.queue)
+            if self.tickets.get(actor) != ticket:
+                continue  # Cancelled or replaced.
+            del self.tickets[actor]
+            if not actor.is_alive:
+                continue
+
+            self.time = due
+            yield actor
+
+        self.time = max(self.time, until)
@@ -0,0 +1,66 @@
+"""
+slotted.py
+Pickling and copying for classes that keep their attributes in __slots__.
+
+Entities and their components are created by the thousand, so they store their attributes in slots rather than in a
+per-instance __dict__.  Their pickled state stays a plain {attribute: value} dict, the same as before they were
+slotted, so saves written by either layout load into the other.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Tuple, Type, TypeVar
+
+S = TypeVar("S", bound="Slotted")
+
+_slot_names: Dict[type, Tuple[str, ...]] = {}  # All slots of a class, its bases' included
+
+
+def slot_names(cls: Type[Slotted]) -> Tuple[str, ...]:
+    """Return the names of every slot an instance of `cls` has."""
+    names = _slot_names.get(cls)
+    if names is None:
+        names = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get("__slots__", ())
+            for name in (slots,) if isinstance(slots, str) else slots:
+                if name not in ("__dict__", "__weakref__") and name not in names:
+                    names.append(name)
+        names = _slot_names[cls] = tuple(names)
+    return names
+
+
+class Slotted:
+    __slots__ = ()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Return the attributes that are set, by name.  Unset slots, such as a missing parent, are left out."""
+        state = {}
+        for name in slot_names(type(self)):
+            try:
+                state[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        return state
+
+    def __setstate__(self, state: Any) -> None:
+        """Restore the attributes from __getstate__, or from the __dict__ pickled before the class was slotted.
+
+        Attributes that no longer have a slot are dropped.
+        """
+        if isinstance(state, tuple):  # (dict state, slot state), the default state of slotted objects.
+            dict_state, slot_state = state
+            state = {**(dict_state or {}), **(slot_state or {})}
+        slots = slot_names(type(self))
+        for name, value in state.items():
+            if name in slots:
+                object.__setattr__(self, name, value)
+
+    def copy_slots(self: S) -> S:
+        """Return a shallow copy of this object, made without calling __init__."""
+        clone = object.__new__(type(self))
+        for name in slot_names(type(self)):
+            try:
+                object.__setattr__(clone, name, getattr(self, name))
+            except AttributeError:
+                pass
+        return clone
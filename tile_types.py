@@ -48,9 +48,24 @@ wall = new_tile(
     dark=(ord(" "), (255, 255, 255), (0, 0, 100)),
     light=(ord(" "), (255, 255, 255), (130, 110, 50)),
 )
+up_stairs = new_tile(
+    walkable=True,
+    transparent=True,
+    dark=(ord("<"), (0, 0, 100), (50, 50, 150)),
+    light=(ord("<"), (255, 255, 255), (200, 180, 50)),
+)
 down_stairs = new_tile(
     walkable=True,
     transparent=True,
     dark=(ord(">"), (0, 0, 100), (50, 50, 150)),
     light=(ord(">"), (255, 255, 255), (200, 180, 50)),
 )
+
+# Table of every tile type.  Maps store the index of a cell's tile in this table, its tile ID, in a uint8 array.
+TILES = np.array([floor, wall, up_stairs, down_stairs], dtype=tile_dt)
+FLOOR, WALL, UP_STAIRS, DOWN_STAIRS = range(len(TILES))  # Tile IDs
+
+# Per tile ID lookup tables, indexed with a tile ID array to get the property of every cell.
+TILE_WALKABLE = TILES["walkable"]
+TILE_TRANSPARENT = TILES["transparent"]
+